@@ -12,10 +12,24 @@ from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
+from .cache import ReferenceCache
+from .session import RoutingSession
+from .security import PasswordHasher
+from .profiling import RequestProfiler
+from .compression import ResponseCompressor
+from .jobs import JobRunner
+from .events import EventStream
+from .serialization import json_provider
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
+cache = ReferenceCache()
+hasher = PasswordHasher()
+profiler = RequestProfiler()
+compressor = ResponseCompressor()
+jobs = JobRunner()
+events = EventStream()
 
 def create_app(config_name='default'):
     """
@@ -28,10 +42,19 @@ def create_app(config_name='default'):
     app = Flask(__name__, instance_relative_config=True)
     from .config import config
     app.config.from_object(config[config_name])
+    # Proveedor JSON rápido con fechas y horas en ISO 8601 (ver app/serialization.py)
+    app.json = json_provider(app)
 
     db.init_app(app)
-    migrate.init_app(app, db)
+    from .search import include_object
+    migrate.init_app(app, db, include_object=include_object)
     login_manager.init_app(app)
+    cache.init_app(app)
+    hasher.init_app(app)
+    profiler.init_app(app)
+    compressor.init_app(app)
+    jobs.init_app(app)
+    events.init_app(app)
 
     # Configura JWT usando la clave secreta
     app.config['JWT_SECRET_KEY'] = app.config['SECRET_KEY']
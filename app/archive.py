@@ -0,0 +1,103 @@
+"""
+Archivo de citas cerradas y sus observaciones clínicas (datos fríos).
+Las citas cerradas (canceladas, o atendidas, pagadas y retiradas si se dejó la mascota) con fecha
+anterior al horizonte se copian a appointment_archive / clinical_history_archive con sus mismos ids
+y se borran de las tablas activas, por lotes y un lote por transacción. Así los listados, las
+agendas y los índices de las tablas activas solo crecen con el período reciente.
+
+Se usan tablas de archivo y no particiones de MySQL porque las tablas particionadas no admiten
+claves foráneas; las tablas de archivo funcionan igual en MySQL y en SQLite.
+El historial de un paciente (por mascota o por cita) lee ambas tablas (ver app/routes.py).
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import DateTime, and_, delete, func, insert, literal, or_, select
+
+from app import db
+from app.models import Appointment, ArchivedAppointment, ArchivedClinicalHistory, ClinicalHistory
+from app.controllers import CANCELLED_STATUSES
+from app.search import unindex_observations
+
+# Estados de una cita terminada (además de las canceladas)
+CLOSED_STATUSES = ('atendida',)
+
+
+def closed_before(before):
+    """
+    Condición de cita archivable: fecha anterior a 'before' y cerrada (cancelada, o atendida,
+    pagada y, si se dejó la mascota, ya retirada).
+    """
+    status = func.lower(Appointment.status)
+    return and_(
+        Appointment.date < before,
+        or_(
+            status.in_(CANCELLED_STATUSES),
+            and_(
+                status.in_(CLOSED_STATUSES),
+                Appointment.paid.is_(True),
+                or_(Appointment.drop_off.isnot(True), Appointment.collected.is_(True))
+            )
+        )
+    )
+
+
+def horizon(days):
+    # Fecha límite: se archivan las citas de más de 'days' días
+    return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+
+
+def _copy(source, target, condition, archived_at):
+    # INSERT ... SELECT de las filas de la tabla activa a la de archivo (mismas columnas)
+    columns = [column.key for column in source.__table__.columns]
+    query = select(*source.__table__.columns, literal(archived_at, DateTime)).where(condition)
+    db.session.execute(insert(target).from_select(columns + ['archived_at'], query))
+
+
+def archive_batch(before, batch_size):
+    """
+    Archiva un lote de citas cerradas anteriores a 'before' y sus observaciones, en una transacción.
+    :return: (citas archivadas, observaciones archivadas)
+    """
+    ids = [row[0] for row in db.session.query(Appointment.id)
+           .filter(closed_before(before)).order_by(Appointment.id).limit(batch_size)]
+    if not ids:
+        return 0, 0
+    note_ids = [row[0] for row in db.session.query(ClinicalHistory.id)
+                .filter(ClinicalHistory.appointment_id.in_(ids))]
+    archived_at = datetime.now(timezone.utc)
+    _copy(Appointment, ArchivedAppointment, Appointment.id.in_(ids), archived_at)
+    if note_ids:
+        _copy(ClinicalHistory, ArchivedClinicalHistory, ClinicalHistory.id.in_(note_ids), archived_at)
+        unindex_observations(note_ids)
+        db.session.execute(delete(ClinicalHistory).where(ClinicalHistory.id.in_(note_ids))
+                           .execution_options(synchronize_session=False))
+    # Borrado directo: el archivo no es una baja, así que no deja tombstones para /api/sync
+    db.session.execute(delete(Appointment).where(Appointment.id.in_(ids))
+                       .execution_options(synchronize_session=False))
+    db.session.commit()
+    return len(ids), len(note_ids)
+
+
+def archive_closed(before, batch_size=1000, max_batches=None):
+    """
+    Archiva por lotes todas las citas cerradas anteriores a 'before'.
+    :param before: Fecha límite (datetime)
+    :param batch_size: Citas por lote (y por transacción)
+    :param max_batches: Cantidad máxima de lotes (None: hasta terminar)
+    :return: (citas archivadas, observaciones archivadas)
+    """
+    appointments = notes = batches = 0
+    while max_batches is None or batches < max_batches:
+        archived, archived_notes = archive_batch(before, batch_size)
+        if not archived:
+            break
+        appointments += archived
+        notes += archived_notes
+        batches += 1
+    return appointments, notes
+
+
+def pending_count(before):
+    # Citas que se archivarían con este horizonte (para --dry-run)
+    return db.session.query(func.count(Appointment.id)).filter(closed_before(before)).scalar()
@@ -0,0 +1,93 @@
+"""
+Caché en memoria del proceso para datos de referencia (servicios, veterinarios).
+Cada entrada vence a los CACHE_TTL segundos y, al superar CACHE_MAXSIZE entradas,
+se descarta la usada hace más tiempo (LRU). Las escrituras invalidan el espacio afectado.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class ReferenceCache:
+    """
+    Caché TTL + LRU con contadores de aciertos/fallos por espacio de nombres.
+    Las claves son tuplas cuyo primer elemento es el espacio ('services', 'users', ...).
+    """
+
+    def __init__(self, app=None):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._generations = {}
+        self.enabled = True
+        self.ttl = 300
+        self.maxsize = 256
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('CACHE_ENABLED', True)
+        self.ttl = app.config.get('CACHE_TTL', 300)
+        self.maxsize = app.config.get('CACHE_MAXSIZE', 256)
+        self.clear()
+
+    def _count(self, namespace, outcome):
+        counters = self._stats.setdefault(namespace, {"hits": 0, "misses": 0, "invalidations": 0})
+        counters[outcome] += 1
+
+    def get_or_set(self, key, loader):
+        """
+        Devuelve el valor cacheado para la clave o lo calcula con loader() y lo guarda.
+        :param key: Tupla (espacio, ...parámetros)
+        :param loader: Función sin argumentos que produce el valor (datos ya serializados)
+        """
+        if not self.enabled:
+            return loader()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._count(key[0], 'hits')
+                return entry[1]
+            self._count(key[0], 'misses')
+            generation = self._generations.get(key[0], 0)
+        value = loader()
+        with self._lock:
+            # Si hubo una invalidación mientras se calculaba, el valor puede estar desactualizado
+            if self._generations.get(key[0], 0) != generation:
+                return value
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, namespace):
+        # Elimina todas las entradas de un espacio de nombres
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[key]
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            self._count(namespace, 'invalidations')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._stats = {}
+
+    def stats(self):
+        with self._lock:
+            hits = sum(c["hits"] for c in self._stats.values())
+            misses = sum(c["misses"] for c in self._stats.values())
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": hits / (hits + misses) if hits + misses else None,
+                "namespaces": {name: dict(counters) for name, counters in self._stats.items()}
+            }
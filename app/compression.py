@@ -0,0 +1,110 @@
+"""
+Compresión negociada de las respuestas (Accept-Encoding: br / gzip).
+Se comprimen las respuestas de tipos de texto (JSON, CSV, NDJSON) que superan COMPRESSION_MIN_SIZE;
+las exportaciones en streaming se comprimen por bloques a medida que se generan.
+Brotli se usa solo si el paquete 'brotli' está instalado y el cliente lo acepta.
+"""
+
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+
+class _Gzip:
+    def __init__(self, level):
+        # wbits=31: formato gzip (cabecera y CRC) en lugar de zlib
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+class ResponseCompressor:
+    """
+    Comprime las respuestas en after_request según Accept-Encoding y la configuración:
+    COMPRESSION_ENABLED, COMPRESSION_MIN_SIZE (bytes), COMPRESSION_MIMETYPES,
+    COMPRESSION_GZIP_LEVEL y COMPRESSION_BROTLI_QUALITY.
+    """
+
+    def __init__(self, app=None):
+        self.min_size = 1024
+        self.mimetypes = ()
+        self.gzip_level = 6
+        self.brotli_quality = 4
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('COMPRESSION_ENABLED', True):
+            return
+        self.min_size = app.config.get('COMPRESSION_MIN_SIZE', 1024)
+        self.mimetypes = tuple(app.config.get('COMPRESSION_MIMETYPES', ('application/json',)))
+        self.gzip_level = app.config.get('COMPRESSION_GZIP_LEVEL', 6)
+        self.brotli_quality = app.config.get('COMPRESSION_BROTLI_QUALITY', 4)
+        app.after_request(self._compress)
+
+    def _encoding(self):
+        # Codificación preferida por el cliente entre las disponibles ('br' gana en empate)
+        accepted = request.accept_encodings
+        options = [('br', accepted['br'])] if brotli is not None else []
+        options.append(('gzip', accepted['gzip']))
+        encoding, quality = max(options, key=lambda option: option[1])
+        return encoding if quality > 0 else None
+
+    def _compressor(self, encoding):
+        return _Brotli(self.brotli_quality) if encoding == 'br' else _Gzip(self.gzip_level)
+
+    def _compress(self, response):
+        if response.mimetype not in self.mimetypes or 'Content-Encoding' in response.headers \
+                or response.status_code < 200 or response.status_code in (204, 206, 304):
+            return response
+        response.vary.add('Accept-Encoding')
+        if response.direct_passthrough:
+            return response
+        if not response.is_streamed and response.content_length is not None \
+                and response.content_length < self.min_size:
+            return response
+        encoding = self._encoding()
+        if encoding is None:
+            return response
+        compressor = self._compressor(encoding)
+        if response.is_streamed:
+            # Exportaciones: se comprime cada bloque sin acumular la respuesta en memoria
+            chunks = response.response
+
+            def generate():
+                try:
+                    for chunk in chunks:
+                        data = compressor.compress(chunk if isinstance(chunk, bytes) else chunk.encode())
+                        if data:
+                            yield data
+                    yield compressor.flush()
+                finally:
+                    if hasattr(chunks, 'close'):
+                        chunks.close()
+
+            response.response = generate()
+            response.headers.pop('Content-Length', None)
+        else:
+            response.set_data(compressor.compress(response.get_data()) + compressor.flush())
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -1,6 +1,14 @@
-from app import db
-from app.models import Pet, ClinicalHistory, User, Appointment, Service, Client
-from datetime import datetime, timezone
+from app import db, cache, events
+from app.models import Pet, ClinicalHistory, User, Appointment, Service, Client, DailyRevenue, ArchivedAppointment
+from app.search import index_observation
+from datetime import datetime, timezone, timedelta, time as time_type
+from itertools import islice
+from types import SimpleNamespace
+from flask import current_app
+from sqlalchemy import delete, func, insert, or_, select, tuple_, union_all, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm.exc import StaleDataError
+import time
 
 # --------- Mascotas ---------
 def create_pet(name, species, breed, age, client_id):
@@ -11,36 +19,372 @@ def create_pet(name, species, breed, age, client_id):
     return pet
 
 # --------- Citas ---------
+class AppointmentConflict(Exception):
+    """El veterinario ya tiene una cita que se superpone con el horario pedido."""
+
+    def __init__(self, appointment):
+        super().__init__(f"El veterinario ya tiene la cita {appointment.id} en ese horario")
+        self.appointment = appointment
+
+# Estados que liberan el horario de la cita
+CANCELLED_STATUSES = ('cancelada',)
+
+def _as_datetime(value):
+    # Acepta datetime, date o texto ISO ('YYYY-MM-DD' o 'YYYY-MM-DDTHH:MM')
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        return datetime.combine(value, time_type())
+    return value
+
+def _as_time(value):
+    return time_type.fromisoformat(value) if isinstance(value, str) else value
+
+def appointment_span(day, start_time, duration_minutes):
+    # Inicio y fin de una cita a partir del día, la hora y la duración del servicio
+    starts_at = datetime.combine(_as_datetime(day).date(), _as_time(start_time))
+    return starts_at, starts_at + timedelta(minutes=duration_minutes)
+
+def overlapping_appointments(vet_id, starts_at, ends_at):
+    # Citas activas del veterinario que se superponen con [starts_at, ends_at).
+    # El límite inferior de un día acota el rango sobre el índice (vet_id, starts_at),
+    # suponiendo que ninguna cita dura más de 24 horas.
+    return Appointment.query.filter(
+        Appointment.vet_id == vet_id,
+        Appointment.starts_at >= starts_at - timedelta(days=1),
+        Appointment.starts_at < ends_at,
+        Appointment.ends_at > starts_at,
+        or_(Appointment.status.is_(None), func.lower(Appointment.status).notin_(CANCELLED_STATUSES))
+    )
+
+def schedule_appointment(appointment):
+    # Calcula inicio y fin de la cita y verifica que el veterinario esté libre.
+    # La fila del veterinario se bloquea (SELECT ... FOR UPDATE) hasta el commit, así dos reservas
+    # simultáneas para el mismo veterinario no pueden pasar ambas la verificación.
+    service = db.session.get(Service, appointment.service_id)
+    duration = service.duration_minutes if service else 30
+    appointment.starts_at, appointment.ends_at = appointment_span(appointment.date, appointment.time, duration)
+    if appointment.vet_id is None:
+        return
+    db.session.query(User.id).filter_by(id=appointment.vet_id).with_for_update().first()
+    query = overlapping_appointments(appointment.vet_id, appointment.starts_at, appointment.ends_at)
+    if appointment.id is not None:
+        query = query.filter(Appointment.id != appointment.id)
+    conflict = query.first()
+    if conflict:
+        raise AppointmentConflict(conflict)
+
 def create_appointment(client_id, pet_id, service_id, vet_id, date, time, pickup_code=None, drop_off=False):
     appointment = Appointment(
         client_id=client_id,
         pet_id=pet_id,
         service_id=service_id,
         vet_id=vet_id,
-        date=date,
-        time=time,
+        date=_as_datetime(date),
+        time=_as_time(time),
         pickup_code=pickup_code,
         drop_off=drop_off
     )
+    try:
+        schedule_appointment(appointment)
+    except AppointmentConflict:
+        db.session.rollback()
+        raise
     db.session.add(appointment)
     db.session.commit()
     return appointment
 
+def available_slots(vet_id, day, duration_minutes):
+    # Horarios libres del veterinario en el día para una cita de la duración dada,
+    # calculados con una sola consulta de rango sobre las citas del día
+    config = current_app.config
+    day = _as_datetime(day).date()
+    opening = datetime.combine(day, time_type.fromisoformat(config.get('CLINIC_OPENING_TIME', '09:00')))
+    closing = datetime.combine(day, time_type.fromisoformat(config.get('CLINIC_CLOSING_TIME', '18:00')))
+    step = timedelta(minutes=config.get('APPOINTMENT_SLOT_MINUTES', 15))
+    length = timedelta(minutes=duration_minutes)
+    busy = overlapping_appointments(vet_id, opening, closing) \
+        .with_entities(Appointment.starts_at, Appointment.ends_at).all()
+    slots = []
+    start = opening
+    while start + length <= closing:
+        end = start + length
+        if not any(busy_start < end and busy_end > start for busy_start, busy_end in busy):
+            slots.append(start.strftime('%H:%M'))
+        start += step
+    return slots
+
+def publish_appointment(appointment, type='appointment'):
+    # Evento con el estado actual de la cita (sin relaciones) para /api/events
+    events.publish(type, appointment.id, {
+        "id": appointment.id,
+        "client_id": appointment.client_id,
+        "pet_id": appointment.pet_id,
+        "vet_id": appointment.vet_id,
+        "date": appointment.date,
+        "time": appointment.time,
+        "status": appointment.status,
+        "drop_off": appointment.drop_off,
+        "pickup_code": appointment.pickup_code,
+        "collected": appointment.collected,
+        "paid": appointment.paid,
+        "payment_method": appointment.payment_method,
+        "payment_amount": appointment.payment_amount,
+        "payment_date": appointment.payment_date,
+        "version": appointment.version
+    }, vet_id=appointment.vet_id)
+
+def check_version(appointment, expected):
+    """
+    Compare-and-swap con la versión que leyó el cliente: si la envía y la cita cambió desde
+    entonces, lanza StaleDataError (409). Sin versión igual se controla, al hacer flush, que nadie
+    la haya modificado entre la lectura y la escritura de esta petición.
+    """
+    if expected is None:
+        return
+    if isinstance(expected, bool) or not isinstance(expected, int):
+        raise ValueError("La versión de la cita debe ser un número entero")
+    if expected != appointment.version:
+        raise StaleDataError(f"La cita {appointment.id} está en la versión {appointment.version}, no en la {expected}")
+
 # --------- Pagos ---------
-def register_payment(appointment_id, payment_method=None, payment_amount=None):
-    # Registrar pago de una cita
+def register_payment(appointment_id, payment_method=None, payment_amount=None, version=None):
+    # Registrar pago de una cita (con 'version', solo si la cita no cambió desde que se leyó)
     appointment = Appointment.query.get(appointment_id)
     if appointment:
+        check_version(appointment, version)
+        if appointment.paid:
+            # Se vuelve a registrar un pago: se descuenta el anterior del acumulado diario
+            add_revenue([appointment], sign=-1)
         appointment.paid = True
         if payment_method is not None:
             appointment.payment_method = payment_method
         if payment_amount is not None:
             appointment.payment_amount = payment_amount
         appointment.payment_date = datetime.now(timezone.utc)
+        add_revenue([appointment])
+        # El evento lleva la versión que deja el UPDATE
+        db.session.flush()
+        publish_appointment(appointment, 'payment')
         db.session.commit()
         return appointment
     return None
 
+# --------- Acumulado diario de ingresos ---------
+def _revenue_key(row):
+    # Grupo (día, servicio, método, veterinario) de una cita o de un diccionario de valores
+    get = row.get if isinstance(row, dict) else lambda field: getattr(row, field)
+    payment_date = get('payment_date')
+    day = payment_date.date() if isinstance(payment_date, datetime) else payment_date
+    return (day, get('service_id'), get('payment_method'), get('vet_id')), get('payment_amount') or 0, get('paid')
+
+def add_revenue(rows, sign=1):
+    """
+    Suma (o resta, con sign=-1) los pagos de las citas al acumulado diario, dentro de la transacción
+    en curso. Las citas no pagadas se ignoran.
+    :param rows: Citas o diccionarios con paid, payment_date, payment_amount, payment_method, service_id y vet_id
+    """
+    buckets = {}
+    for row in rows:
+        key, amount, paid = _revenue_key(row)
+        if not paid:
+            continue
+        total, count = buckets.get(key, (0, 0))
+        buckets[key] = (total + sign * amount, count + sign)
+    for (day, service_id, payment_method, vet_id), (total, count) in buckets.items():
+        # Se actualiza una sola fila del grupo (puede haber varias, ver DailyRevenue)
+        existing = db.session.query(DailyRevenue.id, DailyRevenue.payment_count).filter(
+            DailyRevenue.date == day, DailyRevenue.service_id == service_id,
+            DailyRevenue.payment_method == payment_method, DailyRevenue.vet_id == vet_id
+        ).first()
+        if existing is None:
+            db.session.add(DailyRevenue(date=day, service_id=service_id, payment_method=payment_method,
+                                        vet_id=vet_id, total=total, payment_count=count))
+            continue
+        row_id, current_count = existing
+        if current_count + count == 0:
+            # El grupo quedó sin pagos: se elimina para que no aparezca en los desgloses
+            db.session.execute(
+                delete(DailyRevenue).where(DailyRevenue.id == row_id).execution_options(synchronize_session=False)
+            )
+        else:
+            db.session.execute(
+                update(DailyRevenue).where(DailyRevenue.id == row_id)
+                .values(total=DailyRevenue.total + total, payment_count=DailyRevenue.payment_count + count)
+                .execution_options(synchronize_session=False)
+            )
+
+def paid_appointments(start=None, before=None):
+    """
+    Pagos de las citas activas y de las archivadas (app/archive.py), como subconsulta UNION ALL
+    con las columnas que usan el acumulado diario y los resúmenes.
+    :param start: Fecha de pago mínima, incluida
+    :param before: Fecha de pago límite, excluida
+    """
+    selects = []
+    for model in (Appointment, ArchivedAppointment):
+        paid = select(
+            model.payment_date, model.service_id, model.payment_method, model.vet_id, model.payment_amount, model.id
+        ).where(model.paid.is_(True))
+        if start:
+            paid = paid.where(model.payment_date >= start)
+        if before:
+            paid = paid.where(model.payment_date < before)
+        selects.append(paid)
+    return union_all(*selects).subquery('pagos')
+
+def rebuild_daily_revenue(start_date=None, end_date=None):
+    """
+    Recalcula el acumulado diario desde las citas pagadas (carga inicial o reparación).
+    :param start_date: Primer día a recalcular (date); sin rango se recalcula todo
+    :param end_date: Último día a recalcular, inclusive (date)
+    :return: Cantidad de grupos escritos
+    """
+    payments = paid_appointments(start_date, end_date + timedelta(days=1) if end_date else None)
+    day = func.date(payments.c.payment_date)
+    source = select(
+        day, payments.c.service_id, payments.c.payment_method, payments.c.vet_id,
+        func.coalesce(func.sum(payments.c.payment_amount), 0), func.count(payments.c.id)
+    ).group_by(day, payments.c.service_id, payments.c.payment_method, payments.c.vet_id)
+    stale = DailyRevenue.query
+    if start_date:
+        stale = stale.filter(DailyRevenue.date >= start_date)
+    if end_date:
+        stale = stale.filter(DailyRevenue.date <= end_date)
+    stale.delete(synchronize_session=False)
+    result = db.session.execute(insert(DailyRevenue).from_select(
+        ['date', 'service_id', 'payment_method', 'vet_id', 'total', 'payment_count'], source
+    ))
+    db.session.commit()
+    return result.rowcount
+
+# --------- Cambios de citas en lote ---------
+# Campos que acepta PATCH /api/appointments/batch (fecha y hora no: requieren verificar la agenda)
+BATCH_FIELDS = ('id', 'version', 'status', 'drop_off', 'pickup_code', 'collected', 'paid',
+                'payment_method', 'payment_amount')
+
+# Columnas leídas de cada cita del lote: control de versión, acumulado diario y evento
+_BATCH_COLUMNS = (
+    Appointment.id, Appointment.version, Appointment.client_id, Appointment.pet_id, Appointment.vet_id,
+    Appointment.service_id, Appointment.date, Appointment.time, Appointment.status, Appointment.drop_off,
+    Appointment.pickup_code, Appointment.collected, Appointment.paid, Appointment.payment_method,
+    Appointment.payment_amount, Appointment.payment_date
+)
+
+def _batch_values(item, now):
+    # Valores a asignar de un cambio del lote; ValueError si el cambio no es válido
+    unknown = set(item) - set(BATCH_FIELDS)
+    if {'date', 'time'} & unknown:
+        raise ValueError("Para cambiar la fecha o la hora use PUT /api/appointments/<id>")
+    if unknown:
+        raise ValueError(f"Campos no soportados: {', '.join(sorted(unknown))}")
+    values = {}
+    if 'status' in item:
+        if not isinstance(item['status'], str) or not item['status']:
+            raise ValueError("El campo 'status' debe ser un texto")
+        values['status'] = item['status'].lower()
+    for field in ('drop_off', 'collected'):
+        if field in item:
+            if not isinstance(item[field], bool):
+                raise ValueError(f"El campo '{field}' debe ser true o false")
+            values[field] = item[field]
+    if 'pickup_code' in item:
+        values['pickup_code'] = _optional(item, 'pickup_code')
+    if 'paid' in item or 'payment_method' in item or 'payment_amount' in item:
+        # Mismo efecto que POST /api/payments: un lote registra pagos, no los anula
+        if item.get('paid') is not True:
+            raise ValueError("Para registrar un pago envíe 'paid': true (los pagos no se anulan en lote)")
+        values.update(paid=True, payment_date=now)
+        if _optional(item, 'payment_method') is not None:
+            values['payment_method'] = item['payment_method']
+        if _optional(item, 'payment_amount') is not None:
+            values['payment_amount'] = _to_float(item, 'payment_amount')
+    if not values:
+        raise ValueError("El cambio no modifica ningún campo")
+    return values
+
+def _apply_batch(changes, now):
+    """
+    Aplica los cambios válidos en la transacción en curso, con un UPDATE por grupo de citas con
+    los mismos valores (WHERE (id, version) IN ...). Lanza StaleDataError si otra petición
+    modificó alguna cita después de leerla.
+    :param changes: Lista de (posición, id, versión esperada o None, valores)
+    :return: Resultados por posición
+    """
+    ids = [appointment_id for _, appointment_id, _, _ in changes]
+    current = {row.id: row._asdict() for row in
+               db.session.query(*_BATCH_COLUMNS).filter(Appointment.id.in_(ids))}
+    results, groups, previous_payments, payments = {}, {}, [], []
+    for position, appointment_id, expected, values in changes:
+        row = current.get(appointment_id)
+        if row is None:
+            results[position] = {"id": appointment_id, "status": 404, "message": "Cita no encontrada"}
+            continue
+        if expected is not None and expected != row['version']:
+            results[position] = {"id": appointment_id, "status": 409, "version": row['version'],
+                                 "message": f"La cita está en la versión {row['version']}, no en la {expected}"}
+            continue
+        groups.setdefault(tuple(sorted(values.items())), []).append(row)
+        updated = dict(row, **values, version=row['version'] + 1)
+        if values.get('paid'):
+            if row['paid']:
+                # Se vuelve a registrar un pago: se descuenta el anterior del acumulado diario
+                previous_payments.append(row)
+            payments.append(updated)
+        publish_appointment(SimpleNamespace(**updated), 'payment' if values.get('paid') else 'appointment')
+        results[position] = {"id": appointment_id, "status": 200, "version": updated['version']}
+    for values, rows in groups.items():
+        # updated_at se asigna explícitamente: así /api/sync ve los cambios igual que con el ORM
+        result = db.session.execute(
+            update(Appointment)
+            .where(tuple_(Appointment.id, Appointment.version).in_([(row['id'], row['version']) for row in rows]))
+            .values({**dict(values), 'version': Appointment.version + 1, 'updated_at': now})
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != len(rows):
+            raise StaleDataError(f"{len(rows) - result.rowcount} citas del lote cambiaron durante la actualización")
+    add_revenue(previous_payments, sign=-1)
+    add_revenue(payments)
+    return results
+
+def batch_update_appointments(items, attempts=3):
+    """
+    Aplica una lista de cambios de citas (estado, retiro, pago) en una sola transacción.
+    Los cambios inválidos, de citas inexistentes o con una versión vieja se informan en su
+    resultado y no impiden aplicar el resto. Si una cita cambia entre la lectura y el UPDATE se
+    vuelve a intentar el lote completo con datos frescos (hasta 'attempts' veces).
+    :param items: Lista de diccionarios con 'id' y los campos de BATCH_FIELDS
+    :return: Resultados en el mismo orden que los cambios ({"id", "status", "version" o "message"})
+    """
+    results, changes = {}, []
+    now = datetime.now(timezone.utc)
+    seen = set()
+    for position, item in enumerate(items):
+        appointment_id = item.get('id') if isinstance(item, dict) else None
+        try:
+            if isinstance(appointment_id, bool) or not isinstance(appointment_id, int):
+                raise ValueError("Cada cambio debe tener el 'id' (entero) de la cita")
+            if appointment_id in seen:
+                raise ValueError("La cita aparece más de una vez en el lote")
+            seen.add(appointment_id)
+            expected = item.get('version')
+            if expected is not None and (isinstance(expected, bool) or not isinstance(expected, int)):
+                raise ValueError("La versión de la cita debe ser un número entero")
+            changes.append((position, appointment_id, expected, _batch_values(item, now)))
+        except ValueError as e:
+            results[position] = {"id": appointment_id, "status": 400, "message": str(e)}
+    for attempt in range(1, attempts + 1):
+        try:
+            applied = _apply_batch(changes, now) if changes else {}
+            db.session.commit()
+            break
+        except StaleDataError:
+            db.session.rollback()
+            if attempt == attempts:
+                raise
+    results.update(applied)
+    return [results[position] for position in range(len(items))]
+
 # --------- Historial clínico ---------
 def add_clinical_observation(pet_id, observation, appointment_id=None, vet_id=None):
     # Agregar observación clínica a una mascota
@@ -51,6 +395,17 @@ def add_clinical_observation(pet_id, observation, appointment_id=None, vet_id=No
         vet_id=vet_id 
     )
     db.session.add(clinical_history)
+    db.session.flush()
+    # El índice de búsqueda se actualiza en la misma transacción
+    index_observation(clinical_history)
+    events.publish('clinical_history', clinical_history.id, {
+        "id": clinical_history.id,
+        "pet_id": clinical_history.pet_id,
+        "appointment_id": clinical_history.appointment_id,
+        "vet_id": clinical_history.vet_id,
+        "date": clinical_history.date,
+        "observation": clinical_history.observation
+    }, vet_id=clinical_history.vet_id)
     db.session.commit()
     return clinical_history
 
@@ -61,6 +416,7 @@ def create_user(username, email, role, password):
     user.set_password(password)
     db.session.add(user)
     db.session.commit()
+    cache.invalidate('users')
     return user
 
 def delete_user(user_id):
@@ -69,6 +425,7 @@ def delete_user(user_id):
     if user:
         db.session.delete(user)
         db.session.commit()
+        cache.invalidate('users')
         return True
     return False
 
@@ -96,13 +453,14 @@ def create_client(name, email, phone=None, address=None, dni=None, notes=None):
     return client
 
 # --------- Servicios ---------
-def create_service(name, description=None, price=None):
-    service = Service(name=name, description=description, price=price)
+def create_service(name, description=None, price=None, duration_minutes=None):
+    service = Service(name=name, description=description, price=price, duration_minutes=duration_minutes or 30)
     db.session.add(service)
     db.session.commit()
+    cache.invalidate('services')
     return service
 
-def update_service(service_id, name=None, description=None, price=None):
+def update_service(service_id, name=None, description=None, price=None, duration_minutes=None):
     service = Service.query.get(service_id)
     if service:
         if name is not None:
@@ -111,7 +469,10 @@ def update_service(service_id, name=None, description=None, price=None):
             service.description = description
         if price is not None:
             service.price = price
+        if duration_minutes is not None:
+            service.duration_minutes = duration_minutes
         db.session.commit()
+        cache.invalidate('services')
         return service
     return None
 
@@ -120,5 +481,382 @@ def delete_service(service_id):
     if service:
         db.session.delete(service)
         db.session.commit()
+        cache.invalidate('services')
         return True
-    return False
\ No newline at end of file
+    return False
+
+# --------- Reportes ---------
+# Agrupaciones disponibles para el resumen de pagos
+PAYMENT_SUMMARY_GROUPS = ('day', 'week', 'month', 'payment_method', 'service', 'vet')
+
+def _payment_period(group, column=Appointment.payment_date):
+    # Expresión SQL que agrupa una fecha de pago por día, semana (lunes de la semana) o mes
+    if db.engine.dialect.name == 'sqlite':
+        if group == 'day':
+            return func.date(column)
+        if group == 'week':
+            return func.date(column, '-6 days', 'weekday 1')
+        return func.strftime('%Y-%m', column)
+    if group == 'day':
+        return func.date_format(column, '%Y-%m-%d')
+    if group == 'week':
+        return func.date_format(func.subdate(column, func.weekday(column)), '%Y-%m-%d')
+    return func.date_format(column, '%Y-%m')
+
+def _summarize(query, group_by, amount, count, columns, date_column):
+    # Total y desgloses (SUM/COUNT ... GROUP BY) de una consulta sobre los pagos o sobre el
+    # acumulado diario; columns aporta payment_method/service_id/vet_id
+    total, quantity = query.with_entities(amount, count).one()
+    summary = {"total_pagado": total, "cantidad_pagos": int(quantity)}
+    if not group_by:
+        return summary
+    breakdowns = {}
+    for group in group_by:
+        if group in ('day', 'week', 'month'):
+            period = _payment_period(group, date_column).label('periodo')
+            rows = query.with_entities(period, amount, count).group_by(period).order_by(period)
+            breakdowns[group] = [
+                {"periodo": p, "total": t, "cantidad": int(c)} for p, t, c in rows
+            ]
+        elif group == 'payment_method':
+            rows = query.with_entities(columns.payment_method, amount, count) \
+                .group_by(columns.payment_method).order_by(columns.payment_method)
+            breakdowns[group] = [
+                {"payment_method": m, "total": t, "cantidad": int(c)} for m, t, c in rows
+            ]
+        elif group == 'service':
+            rows = query.join(Service, Service.id == columns.service_id) \
+                .with_entities(Service.id, Service.name, amount, count) \
+                .group_by(Service.id, Service.name).order_by(Service.id)
+            breakdowns[group] = [
+                {"service_id": i, "service_name": n, "total": t, "cantidad": int(c)} for i, n, t, c in rows
+            ]
+        elif group == 'vet':
+            rows = query.outerjoin(User, User.id == columns.vet_id) \
+                .with_entities(columns.vet_id, User.username, amount, count) \
+                .group_by(columns.vet_id, User.username).order_by(columns.vet_id)
+            breakdowns[group] = [
+                {"vet_id": i, "veterinarian_name": n, "total": t, "cantidad": int(c)} for i, n, t, c in rows
+            ]
+    summary["resumen"] = breakdowns
+    return summary
+
+def payments_summary(start=None, before=None, group_by=()):
+    """
+    Calcula en SQL (SUM/COUNT ... GROUP BY) el total y los desgloses de los pagos del rango,
+    activos y archivados, sin cargar las filas en memoria.
+    :param start: Fecha de pago mínima, incluida
+    :param before: Fecha de pago límite, excluida
+    """
+    payments = paid_appointments(start, before)
+    query = db.session.query(payments.c.id).select_from(payments)
+    amount = func.coalesce(func.sum(payments.c.payment_amount), 0)
+    return _summarize(query, group_by, amount, func.count(payments.c.id), payments.c, payments.c.payment_date)
+
+def revenue_summary(start_date=None, end_date=None, group_by=()):
+    """
+    Igual que payments_summary pero leyendo el acumulado diario: el costo depende de la cantidad
+    de días y grupos, no de la cantidad de pagos.
+    :param start_date: Primer día incluido (date)
+    :param end_date: Último día incluido (date)
+    """
+    query = DailyRevenue.query
+    if start_date:
+        query = query.filter(DailyRevenue.date >= start_date)
+    if end_date:
+        query = query.filter(DailyRevenue.date <= end_date)
+    amount = func.coalesce(func.sum(DailyRevenue.total), 0)
+    count = func.coalesce(func.sum(DailyRevenue.payment_count), 0)
+    return _summarize(query, group_by, amount, count, DailyRevenue, DailyRevenue.date)
+
+# --------- Importación masiva ---------
+def _required(row, fields):
+    missing = [f for f in fields if row.get(f) in (None, '')]
+    if missing:
+        raise ValueError(f"Campos obligatorios faltantes: {', '.join(missing)}")
+
+def _optional(row, field):
+    value = row.get(field)
+    return None if value in (None, '') else value
+
+def _to_int(row, field):
+    value = _optional(row, field)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"El campo '{field}' debe ser un número entero")
+
+def _to_float(row, field):
+    value = _optional(row, field)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"El campo '{field}' debe ser numérico")
+
+def _to_bool(row, field):
+    value = _optional(row, field)
+    if value is None or isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'si', 'sí', 'yes')
+
+def _to_datetime(row, field):
+    value = _optional(row, field)
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"El campo '{field}' debe tener formato YYYY-MM-DD o YYYY-MM-DDTHH:MM")
+
+def _to_time(row, field):
+    value = _optional(row, field)
+    if value is None:
+        return None
+    try:
+        return time_type.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"El campo '{field}' debe tener formato HH:MM")
+
+def _existing_ids(model, ids):
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return set()
+    return {i for (i,) in db.session.query(model.id).filter(model.id.in_(ids))}
+
+def _chunk_ids(chunk, field):
+    # Ids enteros referenciados en un lote (los inválidos se reportan al validar cada fila)
+    ids = set()
+    for row in chunk:
+        try:
+            ids.add(_to_int(row, field))
+        except ValueError:
+            pass
+    return ids
+
+def _check_new_id(row, context):
+    # Permite conservar el id del sistema anterior, si viene y no está en uso
+    row_id = _to_int(row, 'id')
+    if row_id is not None:
+        if row_id in context['ids']:
+            raise ValueError(f"El id {row_id} ya existe")
+        context['ids'].add(row_id)
+    return row_id
+
+def _client_context(model, chunk):
+    emails = {row.get('email') for row in chunk if row.get('email')}
+    existing = {e for (e,) in db.session.query(Client.email).filter(Client.email.in_(emails))} if emails else set()
+    return {'ids': _existing_ids(model, _chunk_ids(chunk, 'id')), 'emails': existing}
+
+def _clean_client(row, context):
+    _required(row, ['name'])
+    email = _optional(row, 'email')
+    if email is not None:
+        if email in context['emails']:
+            raise ValueError(f"El email {email} ya está registrado")
+        context['emails'].add(email)
+    values = {
+        "id": _check_new_id(row, context),
+        "name": row['name'],
+        "email": email,
+        "phone": _optional(row, 'phone'),
+        "address": _optional(row, 'address'),
+        "dni": _optional(row, 'dni'),
+        "notes": _optional(row, 'notes')
+    }
+    return {k: v for k, v in values.items() if v is not None}
+
+def _pet_context(model, chunk):
+    return {
+        'ids': _existing_ids(model, _chunk_ids(chunk, 'id')),
+        'clients': _existing_ids(Client, _chunk_ids(chunk, 'client_id'))
+    }
+
+def _clean_pet(row, context):
+    _required(row, ['name', 'species', 'breed', 'age', 'client_id'])
+    client_id = _to_int(row, 'client_id')
+    if client_id not in context['clients']:
+        raise ValueError(f"El cliente {client_id} no existe")
+    values = {
+        "id": _check_new_id(row, context),
+        "name": row['name'],
+        "species": row['species'],
+        "breed": row['breed'],
+        "age": _to_int(row, 'age'),
+        "client_id": client_id
+    }
+    return {k: v for k, v in values.items() if v is not None}
+
+def _appointment_context(model, chunk):
+    pet_ids = _chunk_ids(chunk, 'pet_id')
+    pets = dict(db.session.query(Pet.id, Pet.client_id).filter(Pet.id.in_(pet_ids))) if pet_ids else {}
+    return {
+        'ids': _existing_ids(model, _chunk_ids(chunk, 'id')),
+        'pets': pets,
+        'services': dict(db.session.query(Service.id, Service.duration_minutes)
+                         .filter(Service.id.in_(_chunk_ids(chunk, 'service_id')))),
+        'vets': _existing_ids(User, _chunk_ids(chunk, 'vet_id'))
+    }
+
+def _clean_appointment(row, context):
+    _required(row, ['client_id', 'pet_id', 'service_id', 'date', 'time'])
+    client_id = _to_int(row, 'client_id')
+    pet_id = _to_int(row, 'pet_id')
+    service_id = _to_int(row, 'service_id')
+    vet_id = _to_int(row, 'vet_id')
+    if context['pets'].get(pet_id) != client_id:
+        raise ValueError(f"La mascota {pet_id} no existe o no pertenece al cliente {client_id}")
+    if service_id not in context['services']:
+        raise ValueError(f"El servicio {service_id} no existe")
+    if vet_id is not None and vet_id not in context['vets']:
+        raise ValueError(f"El veterinario {vet_id} no existe")
+    day = _to_datetime(row, 'date')
+    start_time = _to_time(row, 'time')
+    starts_at, ends_at = appointment_span(day, start_time, context['services'][service_id])
+    values = {
+        "id": _check_new_id(row, context),
+        "client_id": client_id,
+        "pet_id": pet_id,
+        "service_id": service_id,
+        "vet_id": vet_id,
+        "date": day,
+        "time": start_time,
+        "starts_at": starts_at,
+        "ends_at": ends_at,
+        "status": _optional(row, 'status'),
+        "paid": _to_bool(row, 'paid'),
+        "payment_method": _optional(row, 'payment_method'),
+        "payment_amount": _to_float(row, 'payment_amount'),
+        "payment_date": _to_datetime(row, 'payment_date'),
+        "drop_off": _to_bool(row, 'drop_off'),
+        "pickup_code": _optional(row, 'pickup_code'),
+        "collected": _to_bool(row, 'collected')
+    }
+    return {k: v for k, v in values.items() if v is not None}
+
+# Entidades importables: nombre -> (modelo, carga del contexto por lote, validación por fila)
+BULK_IMPORTS = {
+    'clients': (Client, _client_context, _clean_client),
+    'pets': (Pet, _pet_context, _clean_pet),
+    'appointments': (Appointment, _appointment_context, _clean_appointment)
+}
+
+def bulk_import(entity, rows, chunk_size=500):
+    """
+    Importa filas en lotes: cada lote se valida con pocas consultas (ids existentes con IN),
+    se inserta con un único INSERT de varias filas y se confirma en su propia transacción.
+    :param entity: 'clients', 'pets' o 'appointments'
+    :param rows: Iterable de diccionarios (JSON o filas de CSV)
+    :param chunk_size: Filas por lote/transacción
+    :return: Diccionario con filas creadas, errores por fila y filas por segundo
+    """
+    model, load_context, clean = BULK_IMPORTS[entity]
+    started = time.perf_counter()
+    rows = iter(rows)
+    total = created = 0
+    errors = []
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        first = total + 1
+        total += len(chunk)
+        context = load_context(model, chunk)
+        values = []
+        for number, row in enumerate(chunk, start=first):
+            try:
+                values.append(clean(row, context))
+            except ValueError as e:
+                errors.append({"row": number, "error": str(e)})
+        if not values:
+            continue
+        try:
+            db.session.execute(insert(model), values)
+            if model is Appointment:
+                # Las citas importadas como pagadas se suman al acumulado diario en el mismo lote
+                add_revenue(values)
+            db.session.commit()
+            created += len(values)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            errors.append({"rows": [first, total], "error": str(getattr(e, 'orig', e))})
+    elapsed = time.perf_counter() - started
+    return {
+        "received": total,
+        "created": created,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(created / elapsed, 1) if elapsed else None
+    }
+
+# --------- Búsqueda rápida (typeahead) ---------
+def _prefix(value):
+    # Patrón LIKE 'valor%' con los comodines escapados, para que use el índice de la columna
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def lookup_clients(q, limit=10):
+    # Clientes cuyo nombre, DNI, email o teléfono empieza con q. Una consulta por columna,
+    # cada una con su índice y LIMIT, así el costo no depende del total de clientes.
+    columns = [Client.name, Client.dni, Client.email, Client.phone]
+    matches = {}
+    for column in columns if q else columns[:1]:
+        query = db.session.query(Client.id, Client.name, Client.dni)
+        if q:
+            query = query.filter(column.like(_prefix(q), escape='\\'))
+        for client_id, name, dni in query.order_by(column).limit(limit):
+            matches[client_id] = f"{name} ({dni})" if dni else name
+    ordered = sorted(matches.items(), key=lambda item: (item[1].lower(), item[0]))[:limit]
+    return [{"id": client_id, "label": label} for client_id, label in ordered]
+
+def lookup_pets(q, client_id=None, limit=10):
+    # Mascotas cuyo nombre empieza con q (opcionalmente de un cliente), con el dueño en la etiqueta
+    query = db.session.query(Pet.id, Pet.name, Pet.species, Client.name).join(Client, Client.id == Pet.client_id)
+    if client_id:
+        query = query.filter(Pet.client_id == client_id)
+    if q:
+        query = query.filter(Pet.name.like(_prefix(q), escape='\\'))
+    rows = query.order_by(Pet.name, Pet.id).limit(limit)
+    return [{"id": pet_id, "label": f"{name} ({species}) - {owner}"} for pet_id, name, species, owner in rows]
+
+# --------- Carga inicial de pantallas (bootstrap) ---------
+def _project(query):
+    # Filas de una consulta con with_entities como diccionarios (el proveedor JSON formatea fechas y horas)
+    return [dict(row._mapping) for row in query]
+
+def bootstrap_appointments():
+    # Datos de la pantalla de citas: selectores del formulario y listado de citas
+    return {
+        "clients": _project(Client.query.with_entities(Client.id, Client.name).order_by(Client.id)),
+        "pets": _project(Pet.query.with_entities(Pet.id, Pet.name, Pet.client_id).order_by(Pet.id)),
+        "services": _project(Service.query.with_entities(Service.id, Service.name, Service.duration_minutes).order_by(Service.id)),
+        "vets": _project(User.query.filter_by(role='veterinario').with_entities(User.id, User.username).order_by(User.id)),
+        "appointments": _project(Appointment.query.with_entities(
+            Appointment.id, Appointment.client_id, Appointment.pet_id, Appointment.service_id,
+            Appointment.vet_id, Appointment.date, Appointment.time, Appointment.status,
+            Appointment.drop_off, Appointment.pickup_code, Appointment.collected, Appointment.version
+        ).order_by(Appointment.date, Appointment.id))
+    }
+
+def bootstrap_payments():
+    # Datos de la pantalla de pagos: pagos registrados, citas atendidas sin pagar y nombres/precios
+    columns = (Appointment.id, Appointment.client_id, Appointment.pet_id, Appointment.service_id, Appointment.date)
+    return {
+        "payments": _project(Appointment.query.filter_by(paid=True).with_entities(
+            *columns, Appointment.payment_amount, Appointment.payment_method, Appointment.payment_date
+        ).order_by(Appointment.payment_date, Appointment.id)),
+        "pending": _project(Appointment.query.filter(
+            or_(Appointment.paid.is_(False), Appointment.paid.is_(None)), func.lower(Appointment.status) == 'atendida'
+        ).with_entities(*columns).order_by(Appointment.date, Appointment.id)),
+        "clients": _project(Client.query.with_entities(Client.id, Client.name).order_by(Client.id)),
+        "pets": _project(Pet.query.with_entities(Pet.id, Pet.name).order_by(Pet.id)),
+        "services": _project(Service.query.with_entities(Service.id, Service.name, Service.price).order_by(Service.id))
+    }
+
+# Pantallas soportadas por /api/bootstrap/<screen>
+BOOTSTRAP_SCREENS = {
+    'appointments': bootstrap_appointments,
+    'payments': bootstrap_payments
+}
@@ -0,0 +1,148 @@
+"""
+Eventos de cambios en streaming (Server-Sent Events) para /api/events.
+publish() agrega el evento a la transacción en curso (tabla change_event); al confirmarse, se
+despiertan los streams de este proceso y los de otros procesos lo leen en su siguiente consulta
+(cada EVENTS_POLL_SECONDS). Cada evento lleva su id, así que el navegador retoma desde el último
+recibido (Last-Event-ID) al reconectarse.
+
+    id: 42
+    event: appointment
+    data: {"id": 7, "status": "atendida", ...}
+
+Los ids se asignan al insertar, no al confirmar: una transacción puede confirmar un evento con id
+menor al último enviado. Por eso cada consulta vuelve a leer los eventos de los últimos
+EVENTS_SAFETY_WINDOW segundos y envía los que faltan (igual que SYNC_SAFETY_WINDOW en /api/sync);
+al reconectarse, el cliente puede recibir de nuevo eventos de esa ventana.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import event
+
+EVENT_TYPES = ('appointment', 'payment', 'clinical_history')
+
+
+class EventStream:
+    """
+    Publica eventos de cambios y los entrega a los streams SSE abiertos.
+    Configuración: EVENTS_POLL_SECONDS, EVENTS_HEARTBEAT_SECONDS, EVENTS_MAX_STREAM_SECONDS,
+    EVENTS_BATCH_SIZE, EVENTS_SAFETY_WINDOW y EVENTS_RETENTION_HOURS.
+    """
+
+    def __init__(self, app=None):
+        self.poll_seconds = 2
+        self.heartbeat_seconds = 15
+        self.max_stream_seconds = 300
+        self.batch_size = 100
+        self.safety_window = timedelta(seconds=10)
+        self.retention = timedelta(hours=24)
+        self._condition = threading.Condition()
+        self._generation = 0  # aumenta con cada commit que publicó eventos
+        self._last_purge = 0
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.poll_seconds = app.config.get('EVENTS_POLL_SECONDS', 2)
+        self.heartbeat_seconds = app.config.get('EVENTS_HEARTBEAT_SECONDS', 15)
+        self.max_stream_seconds = app.config.get('EVENTS_MAX_STREAM_SECONDS', 300)
+        self.batch_size = app.config.get('EVENTS_BATCH_SIZE', 100)
+        self.safety_window = timedelta(seconds=app.config.get('EVENTS_SAFETY_WINDOW', 10))
+        self.retention = timedelta(hours=app.config.get('EVENTS_RETENTION_HOURS', 24))
+        if not self._listening:
+            from app import db
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_rollback', self._after_rollback)
+            self._listening = True
+
+    def _after_commit(self, session):
+        # Al confirmar una transacción con eventos, despierta a los streams de este proceso
+        if session.info.pop('events_published', False):
+            self.notify()
+
+    def _after_rollback(self, session):
+        session.info.pop('events_published', None)
+
+    def publish(self, type, entity_id, data, vet_id=None):
+        """
+        Agrega un evento a la transacción en curso (se publica al hacer commit).
+        :param type: 'appointment', 'payment' o 'clinical_history'
+        :param entity_id: Id de la fila modificada
+        :param data: Datos del cambio (se serializan con el proveedor JSON de la app)
+        :param vet_id: Veterinario asociado, para el filtro ?vet_id=
+        """
+        from app import db
+        from app.models import ChangeEvent
+        db.session.add(ChangeEvent(type=type, entity_id=entity_id, vet_id=vet_id,
+                                   payload=current_app.json.dumps(data)))
+        db.session.info['events_published'] = True
+        # Los eventos viejos se borran como mucho una vez por hora, en la misma transacción
+        if time.monotonic() - self._last_purge > 3600:
+            self._last_purge = time.monotonic()
+            cutoff = datetime.now(timezone.utc) - self.retention
+            ChangeEvent.query.filter(ChangeEvent.created_at < cutoff).delete(synchronize_session=False)
+
+    def notify(self):
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+    def last_id(self):
+        from app import db
+        from app.models import ChangeEvent
+        return db.session.query(db.func.max(ChangeEvent.id)).scalar() or 0
+
+    def _fetch(self, after_id, vet_id, types, since):
+        """
+        Eventos posteriores a after_id (como mucho EVENTS_BATCH_SIZE) y, además, los de id menor
+        creados desde 'since' (confirmados tarde).
+        :return: (filas ordenadas por id, True si se completó el lote de eventos nuevos)
+        """
+        from app import db
+        from app.models import ChangeEvent
+        query = db.session.query(ChangeEvent.id, ChangeEvent.type, ChangeEvent.payload, ChangeEvent.created_at)
+        if vet_id is not None:
+            query = query.filter(ChangeEvent.vet_id == vet_id)
+        if types:
+            query = query.filter(ChangeEvent.type.in_(types))
+        rows = query.filter(ChangeEvent.id > after_id).order_by(ChangeEvent.id).limit(self.batch_size).all()
+        late = query.filter(ChangeEvent.id <= after_id, ChangeEvent.created_at >= since) \
+            .order_by(ChangeEvent.id).all()
+        # Se libera la conexión entre consultas: el stream puede quedar abierto minutos
+        db.session.close()
+        return late + rows, len(rows) == self.batch_size
+
+    def stream(self, after_id, vet_id=None, types=()):
+        """
+        Generador de mensajes SSE con los eventos posteriores a after_id.
+        Termina a los EVENTS_MAX_STREAM_SECONDS (el navegador se reconecta solo) para no ocupar
+        un worker indefinidamente; entre eventos envía comentarios para mantener la conexión.
+        """
+        started = last_sent = time.monotonic()
+        sent = {}  # id -> created_at de los eventos enviados dentro de la ventana de seguridad
+        yield f'retry: {self.poll_seconds * 1000}\n\n'
+        while time.monotonic() - started < self.max_stream_seconds:
+            generation = self._generation
+            since = datetime.now(timezone.utc).replace(tzinfo=None) - self.safety_window
+            rows, full = self._fetch(after_id, vet_id, types, since)
+            sent = {event_id: created_at for event_id, created_at in sent.items() if created_at >= since}
+            rows = [row for row in rows if row[0] not in sent]
+            for event_id, type, payload, created_at in rows:
+                after_id = max(after_id, event_id)
+                sent[event_id] = created_at
+                yield f'id: {event_id}\nevent: {type}\ndata: {payload}\n\n'
+            if rows:
+                last_sent = time.monotonic()
+                if full:
+                    continue
+            elif time.monotonic() - last_sent >= self.heartbeat_seconds:
+                last_sent = time.monotonic()
+                yield ': ping\n\n'
+            # Espera un commit de este proceso (sin perder los ocurridos durante la consulta)
+            # o, para los de otros procesos, el intervalo de consulta
+            with self._condition:
+                self._condition.wait_for(lambda: self._generation != generation, self.poll_seconds)
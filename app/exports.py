@@ -0,0 +1,78 @@
+"""
+Exportación en streaming (CSV / NDJSON) para los reportes de la API.
+Las filas se leen por lotes con yield_per y se escriben a la respuesta con un generador,
+de modo que la memoria usada no depende del tamaño del rango exportado.
+"""
+
+import csv
+import io
+from datetime import date, time
+
+from flask import Response, current_app, stream_with_context
+
+from app.pagination import iter_union
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+# Columnas exportadas a CSV (las rutas con punto se leen de los objetos anidados)
+APPOINTMENT_EXPORT_FIELDS = [
+    'id', 'date', 'time', 'status', 'client_id', 'client.name', 'pet_id', 'pet.name',
+    'vet_id', 'vet.username', 'service_id', 'service.name', 'paid', 'payment_method',
+    'payment_amount', 'payment_date', 'drop_off', 'pickup_code', 'collected'
+]
+CLINICAL_HISTORY_EXPORT_FIELDS = [
+    'id', 'date', 'pet_id', 'pet_name', 'owner_name', 'appointment_id', 'service_name',
+    'vet_id', 'veterinarian_name', 'observation'
+]
+
+
+def _lookup(data, path):
+    # Obtiene un valor por ruta con puntos ('pet.name'); None si algún tramo falta
+    for key in path.split('.'):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _csv_value(value):
+    # Mismo formato que en JSON: fechas y horas en ISO 8601, vacío para None
+    if value is None:
+        return ''
+    return value.isoformat() if isinstance(value, (date, time)) else value
+
+
+def _csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+def stream_export(query, fmt, fields, filename, serialize=lambda item: item.to_dict()):
+    """
+    Devuelve una respuesta que exporta la consulta en streaming.
+    :param query: Consulta ya filtrada y ordenada, o lista de (consulta, columnas de ordenamiento)
+                  cuyas filas se exportan combinadas en ese orden
+    :param fmt: 'csv' o 'ndjson'
+    :param fields: Columnas para CSV (ignorado en NDJSON, que exporta el objeto completo)
+    :param filename: Nombre sugerido del archivo (sin extensión)
+    :param serialize: Función que convierte cada fila en diccionario
+    """
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    dumps = current_app.json.dumps
+
+    def generate():
+        if fmt == 'csv':
+            yield _csv_line(fields)
+        rows = iter_union(query, batch_size) if isinstance(query, (list, tuple)) else query.yield_per(batch_size)
+        for item in rows:
+            data = serialize(item)
+            if fmt == 'csv':
+                yield _csv_line([_csv_value(_lookup(data, f)) for f in fields])
+            else:
+                yield dumps(data, ensure_ascii=False) + '\n'
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.{fmt}'
+    return response
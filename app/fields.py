@@ -0,0 +1,160 @@
+"""
+Campos parciales (?fields=) para las respuestas de la API.
+Un Fieldset valida los campos pedidos contra los que publica cada to_dict, arma las opciones
+de carga para que el SELECT solo traiga esas columnas (load_only) y las relaciones necesarias
+(joinedload), y serializa cada fila con el mismo formato que to_dict, pero solo con esos campos.
+
+    ?fields=id,status,pet.name,service.name  ->  {"id": ..., "status": ..., "pet": {"name": ...}, "service": {"name": ...}}
+
+Una relación sin subcampos ('pet') equivale a su to_dict completo.
+"""
+
+from flask import request
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only
+
+from app.models import (
+    User, Pet, Appointment, Service, ClinicalHistory, Client, ArchivedAppointment, ArchivedClinicalHistory
+)
+
+# Campos que publica el to_dict de cada modelo (columnas y relaciones), en el mismo orden
+SERIALIZED_FIELDS = {
+    User: ('id', 'username', 'email', 'role'),
+    Client: ('id', 'name', 'email', 'phone', 'address', 'dni', 'created_at', 'notes'),
+    Service: ('id', 'name', 'description', 'price', 'attention_type', 'duration_minutes'),
+    Pet: ('id', 'name', 'species', 'breed', 'age', 'client_id', 'client'),
+    Appointment: (
+        'id', 'client_id', 'pet_id', 'vet_id', 'service_id', 'date', 'time', 'paid', 'payment_method',
+        'payment_amount', 'payment_date', 'client', 'pet', 'vet', 'service', 'status', 'drop_off',
+        'pickup_code', 'collected', 'version'
+    ),
+    ClinicalHistory: (
+        'id', 'pet_id', 'pet_name', 'observation', 'appointment_id', 'date', 'vet_id',
+        'veterinarian_name', 'owner_name', 'service_name', 'pet', 'appointment'
+    ),
+}
+# Las tablas de archivo publican los mismos campos
+SERIALIZED_FIELDS[ArchivedAppointment] = SERIALIZED_FIELDS[Appointment]
+SERIALIZED_FIELDS[ArchivedClinicalHistory] = SERIALIZED_FIELDS[ClinicalHistory]
+# Campos calculados a partir de relaciones: nombre -> ruta del valor
+ALIASES = {
+    ClinicalHistory: {
+        'pet_name': 'pet.name',
+        'veterinarian_name': 'vet.username',
+        'owner_name': 'pet.client.name',
+        'service_name': 'appointment.service.name',
+    },
+}
+ALIASES[ArchivedClinicalHistory] = ALIASES[ClinicalHistory]
+# Campos que to_dict solo incluye a pedido (?expand=), fuera del conjunto por defecto
+OPTIONAL_FIELDS = {
+    ClinicalHistory: ('pet', 'appointment'),
+    ArchivedClinicalHistory: ('pet', 'appointment'),
+}
+
+
+class FieldsError(ValueError):
+    """Campo pedido en ?fields= que el recurso no publica."""
+
+
+def _relation(model, name):
+    relationship = inspect(model).relationships.get(name)
+    return relationship.mapper.class_ if relationship is not None else None
+
+
+class Fieldset:
+    """
+    Conjunto de campos pedidos para un modelo.
+    :param model: Modelo raíz de la respuesta
+    :param paths: Rutas con puntos ('status', 'pet.name', 'pet')
+    """
+
+    def __init__(self, model, paths):
+        self.model = model
+        self.paths = list(dict.fromkeys(paths))
+        self.tree = {}
+        for path in self.paths:
+            self._add(self.tree, model, path.split('.'), path)
+
+    @classmethod
+    def default(cls, model):
+        # Campos de to_dict sin los opcionales
+        return [f for f in SERIALIZED_FIELDS[model] if f not in OPTIONAL_FIELDS.get(model, ())]
+
+    def for_model(self, model):
+        # Los mismos campos sobre otro modelo con igual serialización (tabla de archivo)
+        return Fieldset(model, self.paths)
+
+    def _add(self, tree, model, parts, path):
+        name = parts[0]
+        if name not in SERIALIZED_FIELDS[model]:
+            raise FieldsError(f"Campo no soportado en 'fields': {path}")
+        alias = ALIASES.get(model, {}).get(name)
+        target = _relation(model, name)
+        if alias is not None or target is None:
+            if len(parts) > 1:
+                raise FieldsError(f"Campo no soportado en 'fields': {path}")
+            # Hoja: ruta de atributos desde la fila hasta el valor
+            tree[name] = tuple(alias.split('.')) if alias else (name,)
+            return
+        subtree = tree.get(name)
+        if not isinstance(subtree, dict):
+            subtree = tree[name] = {}
+        for sub in ([parts[1:]] if len(parts) > 1 else [[f] for f in self.default(target)]):
+            self._add(subtree, target, sub, path)
+
+    def _load_tree(self, tree, model, load):
+        # Columnas y relaciones a cargar (incluye las rutas de los campos calculados)
+        for name, node in tree.items():
+            if isinstance(node, dict):
+                self._load_tree(node, _relation(model, name), load.setdefault(name, {}))
+                continue
+            current, current_model = load, model
+            for attribute in node[:-1]:
+                current_model = _relation(current_model, attribute)
+                current = current.setdefault(attribute, {})
+            current.setdefault(node[-1], None)
+        return load
+
+    def _options(self, model, load):
+        columns = [getattr(model, name) for name, node in load.items() if node is None]
+        columns = columns or [getattr(model, column.key) for column in inspect(model).primary_key]
+        options = [load_only(*columns)]
+        for name, node in load.items():
+            if node is not None:
+                options.append(joinedload(getattr(model, name)).options(*self._options(_relation(model, name), node)))
+        return options
+
+    def apply(self, query, *columns):
+        """
+        Limita la consulta a los campos pedidos.
+        :param query: Consulta sobre el modelo raíz, sin opciones de carga propias
+        :param columns: Columnas del modelo raíz que también se cargan (p. ej. las del ordenamiento)
+        """
+        load = self._load_tree(self.tree, self.model, {})
+        for column in columns:
+            load.setdefault(column.key, None)
+        return query.options(*self._options(self.model, load))
+
+    def _serialize(self, item, tree):
+        data = {}
+        for name, node in tree.items():
+            if isinstance(node, dict):
+                related = getattr(item, name)
+                data[name] = self._serialize(related, node) if related is not None else None
+                continue
+            value = item
+            for attribute in node:
+                value = getattr(value, attribute) if value is not None else None
+            data[name] = value
+        return data
+
+    def serialize(self, item):
+        return self._serialize(item, self.tree)
+
+
+def parse_fields(model):
+    # Lee ?fields= de la petición; None si no se pidió (respuesta completa con to_dict)
+    raw = request.args.get('fields', '')
+    paths = [path.strip() for path in raw.split(',') if path.strip()]
+    return Fieldset(model, paths) if paths else None
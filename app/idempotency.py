@@ -0,0 +1,133 @@
+"""
+Peticiones idempotentes con la cabecera Idempotency-Key (POST /api/payments).
+El cliente genera una clave por operación (un UUID al abrir el formulario de pago) y la repite en
+los reintentos. La primera petición reserva la clave (fila de idempotency_key, única por usuario,
+ruta y clave) antes de ejecutar la vista y guarda la respuesta al terminar; las siguientes con la
+misma clave reciben la respuesta guardada sin volver a ejecutar la operación.
+
+- Misma clave con otro cuerpo: 422.
+- Misma clave mientras la petición original sigue en curso: 409 (el cliente reintenta después).
+- Las respuestas 5xx no se guardan: la clave se libera y el reintento vuelve a ejecutar.
+
+Si el proceso se cae entre la operación y el guardado de la respuesta, la reserva queda sin
+respuesta; pasados IDEMPOTENCY_LOCK_SECONDS otro reintento la toma y vuelve a ejecutar.
+Las claves se conservan IDEMPOTENCY_TTL_HOURS.
+"""
+
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+from flask import Response, current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+
+from app.utils import error_response
+
+HEADER = 'Idempotency-Key'
+
+_last_purge = 0
+
+
+def _now():
+    # Las columnas DateTime guardan UTC sin zona
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _purge_expired():
+    # Las claves vencidas se borran como mucho una vez por hora
+    global _last_purge
+    from app.models import IdempotencyKey
+    if time.monotonic() - _last_purge < 3600:
+        return
+    _last_purge = time.monotonic()
+    cutoff = _now() - timedelta(hours=current_app.config.get('IDEMPOTENCY_TTL_HOURS', 24))
+    IdempotencyKey.query.filter(IdempotencyKey.created_at < cutoff).delete(synchronize_session=False)
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.status_code, mimetype=record.mimetype)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _reserve(user_id, endpoint, key, request_hash):
+    """
+    Reserva la clave para esta petición.
+    :return: (id de la reserva, None) si hay que ejecutar la vista, o (None, respuesta) si no
+    """
+    from app import db
+    from app.models import IdempotencyKey
+    _purge_expired()
+    lookup = IdempotencyKey.query.filter_by(user_id=user_id, endpoint=endpoint, key=key)
+    record = lookup.first()
+    if record is None:
+        record = IdempotencyKey(user_id=user_id, endpoint=endpoint, key=key, request_hash=request_hash,
+                                created_at=_now())
+        db.session.add(record)
+        try:
+            db.session.commit()
+            return record.id, None
+        except IntegrityError:
+            # Otra petición con la misma clave la reservó al mismo tiempo
+            db.session.rollback()
+            record = lookup.first()
+            if record is None:
+                return None, (jsonify(error_response("La petición original sigue en curso", 409)), 409)
+    if record.request_hash != request_hash:
+        return None, (jsonify(error_response(
+            f"La cabecera {HEADER} ya se usó con otra petición; genere una clave nueva", 422)), 422)
+    if record.status_code is not None:
+        return None, _replay(record)
+    lock = timedelta(seconds=current_app.config.get('IDEMPOTENCY_LOCK_SECONDS', 60))
+    if record.created_at > _now() - lock:
+        return None, (jsonify(error_response("La petición original sigue en curso", 409)), 409)
+    # Reserva abandonada: se toma con compare-and-swap para que solo un reintento la ejecute
+    taken = IdempotencyKey.query.filter_by(id=record.id, status_code=None, created_at=record.created_at) \
+        .update({'created_at': _now()}, synchronize_session=False)
+    db.session.commit()
+    if not taken:
+        return None, (jsonify(error_response("La petición original sigue en curso", 409)), 409)
+    return record.id, None
+
+
+def _finish(record_id, response):
+    # Guarda la respuesta de la reserva, o la libera si fue un error del servidor
+    from app import db
+    from app.models import IdempotencyKey
+    db.session.rollback()
+    query = IdempotencyKey.query.filter_by(id=record_id)
+    if response is None or response.status_code >= 500:
+        query.delete(synchronize_session=False)
+    else:
+        query.update({'status_code': response.status_code, 'mimetype': response.mimetype,
+                      'response_body': response.get_data(as_text=True)}, synchronize_session=False)
+    db.session.commit()
+
+
+def idempotent(view):
+    """
+    Hace idempotente una vista de escritura cuando la petición trae la cabecera Idempotency-Key.
+    Va debajo de @jwt_required(): las claves son de cada usuario.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify(error_response(f"La cabecera {HEADER} admite hasta 255 caracteres")), 400
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+        record_id, response = _reserve(int(get_jwt_identity()), f'{request.method} {request.path}', key,
+                                       request_hash)
+        if response is not None:
+            return response
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except BaseException:
+            _finish(record_id, None)
+            raise
+        _finish(record_id, response)
+        return response
+    return wrapper
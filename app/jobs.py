@@ -0,0 +1,185 @@
+"""
+Reportes en segundo plano.
+POST /api/jobs registra el trabajo en la tabla report_job y lo encola en un pool local de hilos
+(JOBS_WORKERS), sin broker externo. El hilo ejecuta la misma función que atiende el reporte
+sincrónico, dentro de un contexto de petición armado con los parámetros guardados, y escribe la
+respuesta (JSON, CSV o NDJSON) en un archivo de JOBS_RESULT_DIR. El estado queda en la base, así
+que cualquier proceso puede responder la consulta y la descarga (mismo host).
+
+La cola vive en la memoria del proceso que recibió el trabajo: si ese proceso se reinicia, sus
+trabajos sin terminar se marcan con error al consultarlos (pasados JOBS_STALE_MINUTES) y hay que
+volver a pedirlos.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from flask import g
+
+logger = logging.getLogger(__name__)
+
+PENDING, RUNNING, DONE, FAILED = 'pendiente', 'en_proceso', 'terminado', 'error'
+
+EXTENSIONS = {'application/json': 'json', 'text/csv': 'csv', 'application/x-ndjson': 'ndjson'}
+
+
+class JobsBusy(Exception):
+    """Hay demasiados trabajos en cola en este proceso."""
+
+
+def _now():
+    # Las columnas DateTime guardan UTC sin zona
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class JobRunner:
+    """
+    Pool de hilos que ejecuta los reportes registrados con register().
+    """
+
+    def __init__(self, app=None):
+        self.workers = 2
+        self.max_pending = 20
+        self.result_dir = None
+        self.result_ttl = timedelta(hours=24)
+        self.reports = {}
+        self._app = None
+        self._executor = None
+        self._slots = None
+        self._active = set()  # ids de los trabajos encolados o en ejecución en este proceso
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._app = app
+        self.workers = app.config.get('JOBS_WORKERS', 2)
+        self.max_pending = app.config.get('JOBS_MAX_PENDING', 20)
+        self.result_dir = app.config.get('JOBS_RESULT_DIR') or os.path.join(app.instance_path, 'jobs')
+        self.result_ttl = timedelta(hours=app.config.get('JOBS_RESULT_TTL_HOURS', 24))
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            # El pool se crea con el primer trabajo: los comandos de consola no levantan hilos
+            self._executor = None
+            self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+            self._active = set()
+
+    def register(self, name, path, view):
+        """
+        Registra un reporte ejecutable en segundo plano.
+        :param name: Nombre usado en POST /api/jobs ('appointments')
+        :param path: Ruta del reporte sincrónico, para el contexto de petición
+        :param view: Función que arma la respuesta leyendo request.args
+        """
+        self.reports[name] = (path, view)
+
+    def submit(self, report, params, user_id):
+        """
+        Registra el trabajo y lo encola. Lanza JobsBusy si la cola del proceso está llena.
+        :param report: Nombre registrado del reporte
+        :param params: Parámetros de consulta del reporte (dict de str)
+        :param user_id: Usuario dueño del trabajo
+        """
+        from app import db
+        from app.models import ReportJob
+        if not self._slots.acquire(blocking=False):
+            raise JobsBusy()
+        try:
+            self.purge_expired()
+            job = ReportJob(report=report, params=json.dumps(params), user_id=user_id, status=PENDING)
+            db.session.add(job)
+            db.session.commit()
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='report-job')
+                self._active.add(job.id)
+                self._executor.submit(self._execute, job.id)
+        except BaseException:
+            self._slots.release()
+            raise
+        return job
+
+    def refresh(self, job):
+        """
+        Marca con error un trabajo sin terminar que no está en la cola de este proceso y lleva
+        más de JOBS_STALE_MINUTES (el proceso que lo recibió probablemente se reinició).
+        """
+        from app import db
+        if job.status not in (PENDING, RUNNING) or job.id in self._active:
+            return job
+        stale = timedelta(minutes=self._app.config.get('JOBS_STALE_MINUTES', 60))
+        if job.created_at > _now() - stale:
+            return job
+        job.status, job.error, job.finished_at = FAILED, "El trabajo se interrumpió; vuelva a solicitarlo", _now()
+        db.session.commit()
+        return job
+
+    def purge_expired(self):
+        # Borra los trabajos (y sus archivos) con más de JOBS_RESULT_TTL_HOURS
+        from app import db
+        from app.models import ReportJob
+        expired = ReportJob.query.filter(ReportJob.created_at < _now() - self.result_ttl) \
+            .filter(ReportJob.status.in_((DONE, FAILED))).all()
+        for job in expired:
+            if job.result_path and os.path.exists(job.result_path):
+                os.remove(job.result_path)
+            db.session.delete(job)
+        if expired:
+            db.session.commit()
+
+    def _execute(self, job_id):
+        try:
+            self._run(job_id)
+        except Exception:
+            logger.exception('Error al ejecutar el trabajo %s', job_id)
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+            self._slots.release()
+
+    def _run(self, job_id):
+        from app import db
+        from app.models import ReportJob
+        app = self._app
+        with app.app_context():
+            job = db.session.get(ReportJob, job_id)
+            path, view = self.reports[job.report]
+            params = json.loads(job.params)
+            job.status, job.started_at = RUNNING, _now()
+            db.session.commit()
+        with app.test_request_context(path, query_string=params):
+            # Solo el reporte lee de la réplica; el estado del trabajo se lee y escribe en la principal
+            g.read_only = True
+            try:
+                response = app.make_response(view())
+                if response.status_code >= 400:
+                    body = response.get_json(silent=True) or {}
+                    raise ValueError(body.get('message') or f"El reporte respondió {response.status_code}")
+                extension = EXTENSIONS.get(response.mimetype, 'bin')
+                os.makedirs(self.result_dir, exist_ok=True)
+                result_path = os.path.join(self.result_dir, f'{job_id}.{extension}')
+                with open(result_path, 'wb') as f:
+                    for chunk in response.iter_encoded():
+                        f.write(chunk)
+                response.close()
+                error = None
+            except Exception as exc:
+                db.session.rollback()
+                error = str(exc)
+            g.read_only = False
+            job = db.session.get(ReportJob, job_id)
+            if error is not None:
+                job.status, job.error, job.finished_at = FAILED, error, _now()
+            else:
+                match = re.search(r'filename=([^;]+)', response.headers.get('Content-Disposition', ''))
+                job.result_path = result_path
+                job.mimetype = response.mimetype
+                job.filename = match.group(1) if match else f'{job.report}.{extension}'
+                job.status, job.finished_at = DONE, _now()
+            db.session.commit()
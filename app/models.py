@@ -1,5 +1,7 @@
-from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+import json
+
+from app import db, hasher
+from sqlalchemy import event
 from datetime import datetime, timezone 
 
 
@@ -14,13 +16,21 @@ class User(db.Model):
     password_hash = db.Column(db.String(256))
     role = db.Column(db.String(20), nullable=False)  # admin, vet, recepcionista, client
 
+    __table_args__ = (
+        db.Index('ix_user_role', 'role'),
+    )
+
     def set_password(self, password):
-        # Guarda la contraseña de forma segura (hash)
-        self.password_hash = generate_password_hash(password)
+        # Guarda la contraseña de forma segura (hash con los parámetros de PASSWORD_HASH_METHOD)
+        self.password_hash = hasher.hash(password)
 
     def check_password(self, password):
-        # Verifica la contraseña
-        return check_password_hash(self.password_hash, password)
+        # Verifica la contraseña en el pool de hash (puede lanzar HasherBusy si está saturado)
+        return hasher.verify(self.password_hash, password)
+
+    def needs_rehash(self):
+        # True si el hash guardado usa parámetros distintos de los configurados
+        return hasher.needs_rehash(self.password_hash)
 
     def to_dict(self):
         # Serializa el usuario a un diccionario (para respuestas JSON)
@@ -42,9 +52,16 @@ class Pet(db.Model):
     breed = db.Column(db.String(80), nullable=False)
     age = db.Column(db.Integer, nullable=False)
     client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
     client = db.relationship('Client', backref=db.backref('pets', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_pet_client_id_name', 'client_id', 'name'),
+        db.Index('ix_pet_name', 'name'),
+        db.Index('ix_pet_updated_at', 'updated_at'),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -76,12 +93,30 @@ class Appointment(db.Model):
     drop_off = db.Column(db.Boolean, default=False)
     pickup_code = db.Column(db.String(20))
     collected = db.Column(db.Boolean, default=False)
+    # Inicio y fin de la cita (fecha + hora, duración según el servicio) para detectar solapamientos
+    starts_at = db.Column(db.DateTime)
+    ends_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    # Versión de la fila: cada UPDATE del ORM la incrementa con WHERE version = <leída> (compare-and-swap)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
     client = db.relationship('Client', foreign_keys=[client_id]) 
     pet = db.relationship('Pet', backref=db.backref('appointments', lazy=True))
     vet = db.relationship('User')
     service = db.relationship('Service', backref=db.backref('appointments', lazy=True))
 
+    # Índices alineados con los filtros y ordenamientos de app/routes.py
+    __table_args__ = (
+        db.Index('ix_appointment_vet_id_date', 'vet_id', 'date'),
+        db.Index('ix_appointment_paid_payment_date', 'paid', 'payment_date'),
+        db.Index('ix_appointment_date', 'date'),
+        db.Index('ix_appointment_service_id', 'service_id'),
+        db.Index('ix_appointment_updated_at', 'updated_at'),
+        db.Index('ix_appointment_vet_id_starts_at', 'vet_id', 'starts_at'),
+    )
+    # Si otra petición modificó la cita después de leerla, el flush lanza StaleDataError
+    __mapper_args__ = {'version_id_col': version}
+
     def to_dict(self):
         # Serializa la cita a un diccionario (incluye datos relacionados)
         return {
@@ -90,12 +125,12 @@ class Appointment(db.Model):
             "pet_id": self.pet_id,
             "vet_id": self.vet_id,
             "service_id": self.service_id,
-            "date": self.date.isoformat() if self.date else None,
-            "time": self.time.isoformat() if self.time else None,
+            "date": self.date,
+            "time": self.time,
             "paid": self.paid,
             "payment_method": self.payment_method,
             "payment_amount": self.payment_amount,
-            "payment_date": self.payment_date.isoformat() if self.payment_date else None,
+            "payment_date": self.payment_date,
             "client": self.client.to_dict() if self.client else None,
             "pet": self.pet.to_dict() if self.pet else None,
             "vet": self.vet.to_dict() if self.vet else None,
@@ -104,6 +139,7 @@ class Appointment(db.Model):
             "drop_off": self.drop_off,
             "pickup_code": self.pickup_code,
             "collected": self.collected,
+            "version": self.version,
         }
 # Modelo de Servicio
 class Service(db.Model):
@@ -115,6 +151,12 @@ class Service(db.Model):
     description = db.Column(db.String(200), nullable=True)
     price = db.Column(db.Float, nullable=False)
     attention_type = db.Column(db.String(80), nullable=False)  # Ej: presencial, a domicilio
+    duration_minutes = db.Column(db.Integer, nullable=False, default=30, server_default='30')
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        db.Index('ix_service_updated_at', 'updated_at'),
+    )
 
     def to_dict(self):
         # Serializa el servicio a un diccionario
@@ -123,7 +165,8 @@ class Service(db.Model):
             "name": self.name,
             "description": self.description,
             "price": self.price,
-            "attention_type": self.attention_type
+            "attention_type": self.attention_type,
+            "duration_minutes": self.duration_minutes
         }
 
 # Modelo de Historial Clínico
@@ -137,26 +180,40 @@ class ClinicalHistory(db.Model):
     appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id'), nullable=True)
     date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     vet_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     vet = db.relationship('User')
 
     pet = db.relationship('Pet', backref=db.backref('clinical_histories', lazy=True))
     appointment = db.relationship('Appointment', backref=db.backref('clinical_histories', lazy=True))
 
-    def to_dict(self):
-        # Serializa el historial clínico a un diccionario (incluye datos relacionados)
-        return {
+    __table_args__ = (
+        db.Index('ix_clinical_history_pet_id_date', 'pet_id', 'date'),
+        db.Index('ix_clinical_history_appointment_id', 'appointment_id'),
+        db.Index('ix_clinical_history_vet_id_date', 'vet_id', 'date'),
+        db.Index('ix_clinical_history_date', 'date'),
+        db.Index('ix_clinical_history_updated_at', 'updated_at'),
+    )
+
+    def to_dict(self, expand=()):
+        # Serializa el historial clínico como fila plana (ids y nombres para mostrar).
+        # 'expand' permite incluir los objetos anidados: 'pet' y/o 'appointment'.
+        data = {
             "id": self.id,
             "pet_id": self.pet_id,
+            "pet_name": self.pet.name if self.pet else None,
             "observation": self.observation,
             "appointment_id": self.appointment_id,
-            "date": self.date.isoformat(),
+            "date": self.date,
             "vet_id": self.vet_id,
-            "pet": self.pet.to_dict() if self.pet else None,
-            "appointment": self.appointment.to_dict() if self.appointment else None,
             "veterinarian_name": self.vet.username if self.vet else None,
             "owner_name": self.pet.client.name if self.pet and self.pet.client else None,
             "service_name": self.appointment.service.name if self.appointment and self.appointment.service else None
         }
+        if 'pet' in expand:
+            data["pet"] = self.pet.to_dict() if self.pet else None
+        if 'appointment' in expand:
+            data["appointment"] = self.appointment.to_dict() if self.appointment else None
+        return data
 
 # Modelo de Cliente
 class Client(db.Model):
@@ -171,6 +228,15 @@ class Client(db.Model):
     dni = db.Column(db.String(30))
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     notes = db.Column(db.Text)     
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        db.Index('ix_client_updated_at', 'updated_at'),
+        # Búsqueda por prefijo en /api/lookup/clients (email ya tiene índice único)
+        db.Index('ix_client_name', 'name'),
+        db.Index('ix_client_dni', 'dni'),
+        db.Index('ix_client_phone', 'phone'),
+    )
 
     def to_dict(self):
         return {
@@ -180,6 +246,192 @@ class Client(db.Model):
             "phone": self.phone,
             "address": self.address,
             "dni": self.dni,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "created_at": self.created_at,
             "notes": self.notes
-        }
\ No newline at end of file
+        }
+
+# Modelo de Acumulado Diario de Ingresos
+class DailyRevenue(db.Model):
+    """
+    Acumulado de pagos por día, servicio, método de pago y veterinario.
+    Se actualiza en la misma transacción que registra o elimina el pago (ver controllers.add_revenue)
+    y se puede recalcular con app/scripts/rebuild_revenue.py. Un mismo grupo puede quedar repartido
+    en más de una fila (dos primeros pagos simultáneos): los reportes siempre suman.
+    """
+    __tablename__ = 'daily_revenue'
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=True)  # día de payment_date (None: pagos sin fecha)
+    service_id = db.Column(db.Integer, nullable=True)
+    payment_method = db.Column(db.String(50), nullable=True)
+    vet_id = db.Column(db.Integer, nullable=True)
+    total = db.Column(db.Float, nullable=False, default=0)
+    payment_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_daily_revenue_bucket', 'date', 'service_id', 'vet_id', 'payment_method'),
+    )
+
+# Archivo (datos fríos): citas cerradas antiguas y sus observaciones (ver app/archive.py).
+# Mismas columnas, ids y serialización que las tablas activas, más la fecha de archivo.
+class ArchivedAppointment(db.Model):
+    """
+    Cita cerrada (atendida y pagada, o cancelada) movida fuera de la tabla appointment.
+    """
+    __tablename__ = 'appointment_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
+    pet_id = db.Column(db.Integer, db.ForeignKey('pet.id'), nullable=False)
+    vet_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    service_id = db.Column(db.Integer, db.ForeignKey('service.id'), nullable=False)
+    date = db.Column(db.DateTime)
+    time = db.Column(db.Time, nullable=False)
+    paid = db.Column(db.Boolean)
+    payment_method = db.Column(db.String(50))
+    payment_amount = db.Column(db.Float)
+    payment_date = db.Column(db.DateTime)
+    status = db.Column(db.String(20))
+    drop_off = db.Column(db.Boolean)
+    pickup_code = db.Column(db.String(20))
+    collected = db.Column(db.Boolean)
+    starts_at = db.Column(db.DateTime)
+    ends_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    archived_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    client = db.relationship('Client')
+    pet = db.relationship('Pet')
+    vet = db.relationship('User')
+    service = db.relationship('Service')
+
+    __table_args__ = (
+        db.Index('ix_appointment_archive_pet_id_date', 'pet_id', 'date'),
+        db.Index('ix_appointment_archive_service_id', 'service_id'),
+    )
+
+    to_dict = Appointment.to_dict
+
+class ArchivedClinicalHistory(db.Model):
+    """
+    Observación clínica de una cita archivada.
+    """
+    __tablename__ = 'clinical_history_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    pet_id = db.Column(db.Integer, db.ForeignKey('pet.id'), nullable=False)
+    observation = db.Column(db.Text, nullable=False)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment_archive.id'), nullable=True)
+    date = db.Column(db.DateTime)
+    vet_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    vet = db.relationship('User')
+    pet = db.relationship('Pet')
+    appointment = db.relationship('ArchivedAppointment', backref=db.backref('clinical_histories', lazy=True))
+
+    __table_args__ = (
+        db.Index('ix_clinical_history_archive_pet_id_date', 'pet_id', 'date'),
+        db.Index('ix_clinical_history_archive_appointment_id', 'appointment_id'),
+    )
+
+    to_dict = ClinicalHistory.to_dict
+
+class ReportJob(db.Model):
+    """
+    Reporte ejecutado en segundo plano (ver app/jobs.py). Guarda el estado para que cualquier
+    proceso pueda responder la consulta de estado y la ruta del archivo con el resultado.
+    """
+    __tablename__ = 'report_job'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    report = db.Column(db.String(50), nullable=False)  # payments, appointments, clinical-history
+    params = db.Column(db.Text, nullable=False)  # parámetros del reporte (JSON)
+    status = db.Column(db.String(20), nullable=False, default='pendiente')  # pendiente, en_proceso, terminado, error
+    error = db.Column(db.Text)
+    result_path = db.Column(db.String(255))
+    mimetype = db.Column(db.String(100))
+    filename = db.Column(db.String(120))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_report_job_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_report_job_created_at', 'created_at'),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "report": self.report,
+            "params": json.loads(self.params),
+            "status": self.status,
+            "error": self.error,
+            "filename": self.filename,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+class ChangeEvent(db.Model):
+    """
+    Cambio publicado en /api/events (cita actualizada, pago registrado, observación agregada).
+    Se escribe en la misma transacción que el cambio, así que solo se publican cambios confirmados,
+    y cualquier proceso lo entrega a sus suscriptores leyendo la tabla por id.
+    """
+    __tablename__ = 'change_event'
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(40), nullable=False)  # appointment, payment, clinical_history
+    entity_id = db.Column(db.Integer, nullable=False)
+    vet_id = db.Column(db.Integer, nullable=True)
+    payload = db.Column(db.Text, nullable=False)  # datos del cambio (JSON)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_change_event_created_at', 'created_at'),
+    )
+
+class IdempotencyKey(db.Model):
+    """
+    Respuesta guardada de una petición con cabecera Idempotency-Key (ver app/idempotency.py).
+    Un reintento con la misma clave recibe esta respuesta sin volver a ejecutar la operación.
+    """
+    __tablename__ = 'idempotency_key'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    endpoint = db.Column(db.String(100), nullable=False)  # método y ruta: POST /api/payments
+    request_hash = db.Column(db.String(64), nullable=False)  # SHA-256 del cuerpo de la petición
+    status_code = db.Column(db.Integer)  # vacío mientras la petición original está en curso
+    mimetype = db.Column(db.String(100))
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'endpoint', 'key', name='uq_idempotency_key_user_endpoint_key'),
+        db.Index('ix_idempotency_key_created_at', 'created_at'),
+    )
+
+# Modelo de Baja (tombstone)
+class Tombstone(db.Model):
+    """
+    Registra la eliminación de una fila sincronizable, para que /api/sync informe las bajas.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(40), nullable=False)  # nombre de la tabla: client, pet, appointment...
+    entity_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_tombstone_deleted_at', 'deleted_at'),
+    )
+
+# Modelos cuyos cambios y bajas se informan en /api/sync
+SYNC_MODELS = (Client, Pet, Appointment, Service, ClinicalHistory)
+
+@event.listens_for(db.session, 'before_flush')
+def record_tombstones(session, flush_context, instances):
+    # Cada eliminación de un modelo sincronizable deja su tombstone en la misma transacción
+    for obj in list(session.deleted):
+        if isinstance(obj, SYNC_MODELS):
+            session.add(Tombstone(entity=obj.__tablename__, entity_id=obj.id))
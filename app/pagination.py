@@ -0,0 +1,202 @@
+"""
+Paginación por cursor (keyset) para los listados de la API.
+Los listados aceptan ?limit=N y ?cursor=<token>; el cursor es opaco para el cliente
+y codifica los valores de ordenamiento de la última fila devuelta.
+"""
+
+import base64
+import heapq
+import json
+from datetime import datetime, date
+
+from flask import request, current_app
+from sqlalchemy import and_, or_
+from sqlalchemy.types import Date, DateTime
+
+
+class PaginationError(ValueError):
+    """Parámetros de paginación inválidos (limit o cursor)."""
+
+
+class Page:
+    """
+    Resultado de una consulta paginada.
+    :param items: Filas de la página
+    :param next_cursor: Cursor para pedir la página siguiente (None si no hay más)
+    :param limit: Tamaño de página (None en modo compatibilidad, sin paginar)
+    """
+
+    def __init__(self, items, next_cursor=None, limit=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.limit = limit
+
+    @property
+    def paginated(self):
+        return self.limit is not None
+
+    def envelope(self, data, key='data'):
+        """
+        Envuelve los datos serializados de la página.
+        En modo compatibilidad devuelve los datos tal cual (lista plana).
+        """
+        if not self.paginated:
+            return data
+        return {
+            key: data,
+            "next_cursor": self.next_cursor,
+            "limit": self.limit
+        }
+
+    def to_response(self, serialize=lambda item: item.to_dict(), key='data'):
+        return self.envelope([serialize(item) for item in self.items], key)
+
+
+def encode_cursor(values):
+    # Serializa los valores de ordenamiento como JSON en base64 url-safe
+    payload = [v.isoformat() if isinstance(v, (datetime, date)) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    # Recupera los valores de ordenamiento del cursor, convirtiendo fechas según el tipo de columna
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise PaginationError("Cursor inválido")
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise PaginationError("Cursor inválido")
+    decoded = []
+    for column, value in zip(columns, values):
+        if value is not None and isinstance(column.type, (DateTime, Date)):
+            try:
+                value = datetime.fromisoformat(value)
+            except (ValueError, TypeError):
+                raise PaginationError("Cursor inválido")
+            if not isinstance(column.type, DateTime):
+                value = value.date()
+        decoded.append(value)
+    return decoded
+
+
+def _after(columns, values):
+    # Condición "fila posterior al cursor" para un orden ascendente por (col1, col2, ...).
+    # Los NULL se ordenan primero (comportamiento de MySQL y SQLite).
+    column, value = columns[0], values[0]
+    if len(columns) == 1:
+        return column > value if value is not None else column.isnot(None)
+    rest = _after(columns[1:], values[1:])
+    if value is None:
+        return or_(column.isnot(None), and_(column.is_(None), rest))
+    return or_(column > value, and_(column == value, rest))
+
+
+def _sort_key(columns):
+    # Mismo orden que la base: NULL primero
+    return lambda row: [(value is not None, value) for value in (getattr(row, c.key) for c in columns)]
+
+
+def parse_limit():
+    """
+    Lee ?limit= y ?cursor= de la petición.
+    :return: Tamaño de página, o None si la petición no pide paginación
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    if limit is None and cursor is None:
+        if current_app.config.get('PAGINATION_LEGACY_LISTS', True):
+            return None
+        return current_app.config.get('PAGINATION_DEFAULT_LIMIT', 100)
+    if limit is None:
+        return current_app.config.get('PAGINATION_DEFAULT_LIMIT', 100)
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise PaginationError("El parámetro 'limit' debe ser un número entero")
+    max_limit = current_app.config.get('PAGINATION_MAX_LIMIT', 1000)
+    if limit < 1 or limit > max_limit:
+        raise PaginationError(f"El parámetro 'limit' debe estar entre 1 y {max_limit}")
+    return limit
+
+
+def paginate(query, *columns):
+    """
+    Aplica paginación keyset a una consulta existente.
+    - Sin 'limit' ni 'cursor' (modo compatibilidad) devuelve todas las filas, como antes.
+    - Con paginación ordena por las columnas dadas (la última debe ser única, normalmente el id)
+      y devuelve como máximo 'limit' filas posteriores al cursor.
+    :param query: Consulta base (con sus filtros y opciones de carga)
+    :param columns: Columnas de ordenamiento, p. ej. Appointment.date, Appointment.id
+    :return: Page
+    """
+    limit = parse_limit()
+    if limit is None:
+        return Page(query.all())
+    cursor = request.args.get('cursor')
+    query = query.order_by(*columns)
+    if cursor:
+        query = query.filter(_after(columns, decode_cursor(cursor, columns)))
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+    return Page(rows, next_cursor, limit)
+
+
+def paginate_union(sources):
+    """
+    Paginación keyset sobre varias consultas con el mismo orden (p. ej. tabla activa y de archivo).
+    Pide a cada consulta como máximo 'limit' filas posteriores al cursor y las combina en orden.
+    :param sources: Lista de (consulta, columnas de ordenamiento); la última columna debe ser única
+    :return: Page
+    """
+    if len(sources) == 1:
+        query, columns = sources[0]
+        return paginate(query, *columns)
+    limit = parse_limit()
+    cursor = request.args.get('cursor')
+    rows = []
+    for query, columns in sources:
+        if limit is not None:
+            query = query.order_by(*columns)
+            if cursor:
+                query = query.filter(_after(columns, decode_cursor(cursor, columns)))
+            query = query.limit(limit + 1)
+        rows += query.all()
+    columns = sources[0][1]
+    rows.sort(key=_sort_key(columns))
+    if limit is None:
+        return Page(rows)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+    return Page(rows, next_cursor, limit)
+
+
+def _batches(query, columns, batch_size):
+    # Recorre la consulta en orden con lotes keyset de 'batch_size' filas
+    query = query.order_by(*columns)
+    rows = query.limit(batch_size).all()
+    while rows:
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last = [getattr(rows[-1], column.key) for column in columns]
+        rows = query.filter(_after(columns, last)).limit(batch_size).all()
+
+
+def iter_union(sources, batch_size):
+    """
+    Recorre todas las filas de varias consultas con el mismo orden, combinadas en ese orden.
+    Cada consulta se lee por lotes keyset (no con yield_per): MySQL no admite dos lecturas en
+    streaming abiertas a la vez en la misma conexión.
+    :param sources: Lista de (consulta, columnas de ordenamiento); la última columna debe ser única
+    """
+    columns = sources[0][1]
+    return heapq.merge(*(_batches(query, cols, batch_size) for query, cols in sources), key=_sort_key(columns))
@@ -0,0 +1,96 @@
+"""
+Instrumentación opcional por petición: cantidad de sentencias SQL y tiempo en la base.
+Con PROFILING_ENABLED cada respuesta incluye un encabezado Server-Timing (visible en las
+herramientas de red del navegador) y las peticiones o consultas que superan los umbrales
+se escriben en el logger 'app.profiling' con el nombre de la ruta y el SQL más lento.
+"""
+
+import logging
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append((time.perf_counter(), context))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started, _ = conn.info['query_started'].pop()
+    stats = g.get('profiling') if has_request_context() else None
+    if stats is None:
+        return
+    elapsed = (time.perf_counter() - started) * 1000
+    stats["queries"] += 1
+    stats["db_ms"] += elapsed
+    # Se guardan las sentencias más lentas (sin parámetros, que pueden tener datos personales)
+    stats["statements"].append((elapsed, statement))
+    stats["statements"].sort(key=lambda item: item[0], reverse=True)
+    del stats["statements"][RequestProfiler.KEEP_STATEMENTS:]
+
+
+def _handle_error(context):
+    # Una sentencia que falla no pasa por after_cursor_execute: se descarta su inicio (solo si
+    # llegó a before_cursor_execute; los errores de conexión o compilación no dejan entrada)
+    started = context.connection.info.get('query_started') if context.connection is not None else None
+    if started and started[-1][1] is context.execution_context:
+        started.pop()
+
+
+class RequestProfiler:
+    """
+    Mide cada petición con before_request/after_request y los eventos de ejecución del Engine.
+    Los eventos se registran una sola vez para todos los engines (principal y réplica) y solo
+    acumulan datos dentro de una petición medida.
+    """
+
+    KEEP_STATEMENTS = 3
+    _listening = False
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.slow_request_ms = 500
+        self.slow_query_ms = 100
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        self.slow_request_ms = app.config.get('PROFILING_SLOW_REQUEST_MS', 500)
+        self.slow_query_ms = app.config.get('PROFILING_SLOW_QUERY_MS', 100)
+        if not self.enabled:
+            return
+        if not RequestProfiler._listening:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+            RequestProfiler._listening = True
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _start(self):
+        g.profiling = {"started": time.perf_counter(), "queries": 0, "db_ms": 0.0, "statements": []}
+
+    def _finish(self, response):
+        stats = g.pop('profiling', None)
+        if stats is None:
+            return response
+        total_ms = (time.perf_counter() - stats["started"]) * 1000
+        response.headers['Server-Timing'] = (
+            f'db;dur={stats["db_ms"]:.1f};desc="{stats["queries"]} SQL", '
+            f'app;dur={total_ms - stats["db_ms"]:.1f}, total;dur={total_ms:.1f}'
+        )
+        slow_queries = [(ms, sql) for ms, sql in stats["statements"] if ms >= self.slow_query_ms]
+        if total_ms >= self.slow_request_ms or slow_queries:
+            statements = slow_queries or stats["statements"][:1]
+            logger.warning(
+                'Petición lenta: %s %s (ruta %s) -> %s en %.1f ms; %d consultas, %.1f ms en la base%s',
+                request.method, request.full_path.rstrip('?'), request.endpoint, response.status_code,
+                total_ms, stats["queries"], stats["db_ms"],
+                ''.join(f'\n  [{ms:.1f} ms] {" ".join(sql.split())}' for ms, sql in statements)
+            )
+        return response
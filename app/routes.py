@@ -1,34 +1,204 @@
-from flask import Blueprint, request, jsonify
+import os
+
+from flask import Blueprint, Response, abort, request, jsonify, current_app, send_file, stream_with_context
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from datetime import datetime
-from app import db
-from app.models import Pet, ClinicalHistory, User, Appointment, Service, Client
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.exc import StaleDataError
+from datetime import datetime, timedelta, timezone
+from app import db, cache, jobs, events
+from app.models import (
+    Pet, ClinicalHistory, User, Appointment, Service, Client, Tombstone, ReportJob,
+    ArchivedAppointment, ArchivedClinicalHistory
+)
 from app.controllers import (
     create_pet, create_appointment, register_payment,
     add_clinical_observation, create_user, delete_user, change_user_password,
-    create_client
+    create_client, payments_summary, revenue_summary, add_revenue, PAYMENT_SUMMARY_GROUPS, bulk_import,
+    schedule_appointment, available_slots, AppointmentConflict, lookup_clients, lookup_pets,
+    BOOTSTRAP_SCREENS, publish_appointment, check_version, batch_update_appointments
 )
 from app.utils import success_response, error_response
+from app.session import read_only
+from app.idempotency import idempotent
+from app.security import HasherBusy
+from app.jobs import JobsBusy
+from app.events import EVENT_TYPES
+from app.pagination import paginate, paginate_union, parse_limit, PaginationError, encode_cursor, decode_cursor
+from app.search import index_observation, search_observations, search_terms
+from app.fields import parse_fields, FieldsError
+from app.exports import (
+    stream_export, EXPORT_FORMATS, APPOINTMENT_EXPORT_FIELDS, CLINICAL_HISTORY_EXPORT_FIELDS
+)
 
 # Prefijo global /api para todas las rutas
 bp = Blueprint('main', __name__, url_prefix='/api')
 
+def appointment_query(fields=None, *columns, model=Appointment):
+    # Consulta de citas con sus relaciones cargadas en el mismo SELECT (evita N+1 al serializar).
+    # Con ?fields= solo carga las columnas y relaciones pedidas, más las columnas indicadas (orden).
+    # model=ArchivedAppointment consulta la tabla de archivo
+    if fields is not None:
+        return fields.for_model(model).apply(model.query, *columns)
+    return model.query.options(
+        joinedload(model.client),
+        joinedload(model.pet).joinedload(Pet.client),
+        joinedload(model.vet),
+        joinedload(model.service)
+    )
+
+def payment_sources(fields, start=None, before=None):
+    # Consultas de los pagos del rango, con su orden (fecha de pago, id). Incluyen las citas
+    # archivadas para que filas y totales coincidan con el acumulado diario
+    sources = []
+    for model in (Appointment, ArchivedAppointment):
+        query = appointment_query(fields, model.payment_date, model=model).filter(model.paid.is_(True))
+        if start:
+            query = query.filter(model.payment_date >= start)
+        if before:
+            query = query.filter(model.payment_date < before)
+        sources.append((query, (model.payment_date, model.id)))
+    return sources
+
+# Objetos anidados que se pueden solicitar con ?expand= en el historial clínico
+CLINICAL_HISTORY_EXPANDS = ('pet', 'appointment')
+
+def cache_key(namespace):
+    # Clave de caché: espacio de nombres + parámetros de la petición
+    return (namespace,) + tuple(sorted(request.args.items(multi=True)))
+
+def parse_choices(param, allowed):
+    # Lee ?param=a,b de la petición; devuelve (valores, error) con error si hay valores no soportados
+    raw = request.args.get(param, '')
+    values = [value.strip() for value in raw.split(',') if value.strip()]
+    invalid = set(values) - set(allowed)
+    if invalid:
+        return None, f"Valores de '{param}' no soportados: {', '.join(sorted(invalid))}"
+    return list(dict.fromkeys(values)), None
+
+def serializer(fields, default=lambda item: item.to_dict()):
+    # Serializa con los campos de ?fields= o, si no se pidieron, con to_dict
+    return fields.serialize if fields is not None else default
+
+def get_serialized(model, item_id, archive=None):
+    # Un recurso por id, con ?fields= aplicado a la consulta (404 si no existe).
+    # Con 'archive' también se busca en la tabla de archivo del modelo
+    fields = parse_fields(model)
+    for current in (model, archive) if archive is not None else (model,):
+        if fields is None:
+            item = db.session.get(current, item_id)
+        else:
+            item = fields.for_model(current).apply(current.query).filter(current.id == item_id).first()
+        if item is not None:
+            return serializer(fields)(item)
+    abort(404)
+
+def export(query, fmt, fields, default_columns, filename, serialize=lambda item: item.to_dict()):
+    # Exportación en streaming; con ?fields= las columnas del CSV son los campos pedidos
+    if fields is None:
+        return stream_export(query, fmt, default_columns, filename, serialize)
+    return stream_export(query, fmt, fields.paths, filename, fields.serialize)
+
+def parse_day(value):
+    # Fecha 'YYYY-MM-DD' de un parámetro; None si falta o trae otra precisión (p. ej. hora)
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+def parse_date_range():
+    """
+    Lee ?start_date= y ?end_date= ('YYYY-MM-DD' o fecha y hora ISO).
+    Devuelve (desde, hasta, error) con 'hasta' exclusivo: un 'YYYY-MM-DD' final abarca el día
+    completo (hasta la medianoche siguiente) y una fecha con hora se incluye.
+    """
+    bounds = []
+    for param in ('start_date', 'end_date'):
+        value = request.args.get(param)
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            bound = datetime.fromisoformat(value)
+        except ValueError:
+            return None, None, f"Formato de '{param}' inválido (YYYY-MM-DD o YYYY-MM-DDTHH:MM)"
+        if bound.tzinfo is not None:
+            # Las columnas guardan UTC sin zona
+            bound = bound.astimezone(timezone.utc).replace(tzinfo=None)
+        if param == 'end_date':
+            bound += timedelta(days=1) if parse_day(value) else timedelta(microseconds=1)
+        bounds.append(bound)
+    return bounds[0], bounds[1], None
+
+def parse_export_format():
+    # Lee ?format=csv|ndjson; devuelve (formato o None, error)
+    fmt = request.args.get('format')
+    if fmt is None or fmt == 'json':
+        return None, None
+    if fmt not in EXPORT_FORMATS:
+        return None, f"Formato no soportado: {fmt} (use csv o ndjson)"
+    return fmt, None
+
+def clinical_history_query(expand=(), fields=None, *columns, archived=False):
+    # Consulta de historial clínico en un solo SELECT con JOINs.
+    # Por defecto solo carga las columnas necesarias para la fila plana (nombres de mascota,
+    # dueño, veterinario y servicio); con 'expand' carga los objetos completos.
+    # Con ?fields= solo carga lo pedido (y 'expand' no aplica).
+    # Con archived=True consulta las tablas de archivo (observaciones de citas archivadas)
+    history, visit = (ArchivedClinicalHistory, ArchivedAppointment) if archived else (ClinicalHistory, Appointment)
+    if fields is not None:
+        return fields.for_model(history).apply(history.query, *columns)
+    if 'pet' in expand:
+        pet_option = joinedload(history.pet).joinedload(Pet.client)
+    else:
+        pet_option = joinedload(history.pet).load_only(Pet.name, Pet.client_id) \
+            .joinedload(Pet.client).load_only(Client.name)
+    options = [
+        pet_option,
+        joinedload(history.vet).load_only(User.username)
+    ]
+    if 'appointment' in expand:
+        options += [
+            joinedload(history.appointment).joinedload(visit.client),
+            joinedload(history.appointment).joinedload(visit.pet).joinedload(Pet.client),
+            joinedload(history.appointment).joinedload(visit.vet),
+            joinedload(history.appointment).joinedload(visit.service)
+        ]
+    else:
+        options.append(
+            joinedload(history.appointment).load_only(visit.service_id)
+            .joinedload(visit.service).load_only(Service.name)
+        )
+    return history.query.options(*options)
+
+def clinical_history_sources(expand, fields, **filters):
+    # Consultas del historial clínico filtrado, con su orden (fecha, id). El historial de un
+    # paciente (por mascota o por cita) incluye las observaciones archivadas; el resto, solo las activas
+    filters = {key: value for key, value in filters.items() if value}
+    patient = 'pet_id' in filters or 'appointment_id' in filters
+    sources = []
+    for archived in ((False, True) if patient else (False,)):
+        history = ArchivedClinicalHistory if archived else ClinicalHistory
+        query = clinical_history_query(expand, fields, history.date, archived=archived).filter_by(**filters)
+        sources.append((query, (history.date, history.id)))
+    return sources
+
 # Mascotas (Pets)
 @bp.route('/pets', methods=['GET'])
 @jwt_required()
+@read_only
 def api_get_pets():
     client_id = request.args.get('client_id')
+    fields = parse_fields(Pet)
+    query = fields.apply(Pet.query) if fields else Pet.query.options(joinedload(Pet.client))
     if client_id:
-        pets = Pet.query.filter_by(client_id=client_id).all()
-    else:
-        pets = Pet.query.all()
-    return jsonify([pet.to_dict() for pet in pets])
+        query = query.filter_by(client_id=client_id)
+    page = paginate(query, Pet.id)
+    return jsonify(page.to_response(serializer(fields)))
 
 @bp.route('/pets/<int:pet_id>', methods=['GET'])
 @jwt_required()
 def api_get_pet(pet_id):
-    pet = Pet.query.get_or_404(pet_id)
-    return jsonify(pet.to_dict())
+    return jsonify(get_serialized(Pet, pet_id))
 
 @bp.route('/pets', methods=['POST'])
 @jwt_required()
@@ -70,15 +240,16 @@ def api_delete_pet(pet_id):
 # Citas (Appointments)
 @bp.route('/appointments', methods=['GET'])
 @jwt_required()
+@read_only
 def api_get_appointments():
-    appointments = Appointment.query.all()
-    return jsonify([appointment.to_dict() for appointment in appointments])
+    fields = parse_fields(Appointment)
+    page = paginate(appointment_query(fields, Appointment.date), Appointment.date, Appointment.id)
+    return jsonify(page.to_response(serializer(fields)))
 
 @bp.route('/appointments/<int:appointment_id>', methods=['GET'])
 @jwt_required()
 def api_get_appointment(appointment_id):
-    appointment = Appointment.query.get_or_404(appointment_id)
-    return jsonify(appointment.to_dict())
+    return jsonify(get_serialized(Appointment, appointment_id, archive=ArchivedAppointment))
 
 @bp.route('/appointments', methods=['POST'])
 @jwt_required()
@@ -88,16 +259,21 @@ def api_create_appointment():
     for field in required_fields:
         if not data.get(field):
             return jsonify(error_response(f"El campo '{field}' es obligatorio")), 400
-    appointment = create_appointment(
-        client_id=data['client_id'],
-        pet_id=data['pet_id'],
-        vet_id=data['vet_id'],
-        service_id=data['service_id'],
-        date=data['date'],
-        time=data['time'],
-        pickup_code=data.get('pickup_code'),
-        drop_off=data.get('drop_off', False)  # <-- Agrega esto
-    )
+    try:
+        appointment = create_appointment(
+            client_id=data['client_id'],
+            pet_id=data['pet_id'],
+            vet_id=data['vet_id'],
+            service_id=data['service_id'],
+            date=data['date'],
+            time=data['time'],
+            pickup_code=data.get('pickup_code'),
+            drop_off=data.get('drop_off', False)  # <-- Agrega esto
+        )
+    except AppointmentConflict as e:
+        return jsonify(error_response(str(e), 409)), 409
+    except ValueError:
+        return jsonify(error_response("Formato de fecha u hora inválido (YYYY-MM-DD, HH:MM)")), 400
     db.session.add(appointment)
     db.session.commit()
     return jsonify(success_response(appointment.to_dict(), "Cita registrada exitosamente")), 201
@@ -107,6 +283,10 @@ def api_create_appointment():
 def api_update_appointment(appointment_id):
     appointment = Appointment.query.get_or_404(appointment_id)
     data = request.json
+    try:
+        check_version(appointment, data.get('version'))
+    except ValueError as e:
+        return jsonify(error_response(str(e))), 400
     if 'date' in data:
         try:
             appointment.date = datetime.strptime(data['date'], '%Y-%m-%d').date()
@@ -125,42 +305,101 @@ def api_update_appointment(appointment_id):
         appointment.pickup_code = data['pickup_code']
     if 'collected' in data:
         appointment.collected = data['collected']
+    if 'date' in data or 'time' in data:
+        # Recalcula el horario y verifica que no se superponga con otra cita del veterinario
+        try:
+            schedule_appointment(appointment)
+        except AppointmentConflict as e:
+            db.session.rollback()
+            return jsonify(error_response(str(e), 409)), 409
+    # El flush aplica el UPDATE (compare-and-swap) y deja en la cita la versión nueva para el evento
+    db.session.flush()
+    publish_appointment(appointment)
     db.session.commit()
     return jsonify(success_response(appointment.to_dict(), "Cita actualizada"))
 
+@bp.route('/appointments/batch', methods=['PATCH'])
+@jwt_required()
+def api_batch_update_appointments():
+    # Cierre del día: varios cambios de estado, retiro o pago en una sola transacción
+    data = request.json
+    items = data.get('changes') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify(error_response("Se espera una lista de cambios ('changes')")), 400
+    max_items = current_app.config.get('APPOINTMENT_BATCH_MAX', 500)
+    if len(items) > max_items:
+        return jsonify(error_response(f"Máximo {max_items} cambios por petición")), 400
+    results = batch_update_appointments(items)
+    updated = sum(1 for result in results if result["status"] == 200)
+    return jsonify(success_response({"results": results, "updated": updated},
+                                    f"{updated} de {len(results)} citas actualizadas"))
+
 @bp.route('/appointments/<int:appointment_id>', methods=['DELETE'])
 @jwt_required()
 def api_delete_appointment(appointment_id):
     appointment = Appointment.query.get_or_404(appointment_id)
+    if appointment.paid:
+        add_revenue([appointment], sign=-1)
     db.session.delete(appointment)
     db.session.commit()
     return jsonify(success_response(message="Cita eliminada"))
 
 @bp.route('/appointments/vet/<int:vet_id>', methods=['GET'])
 @jwt_required()
+@read_only
 def api_get_appointments_by_vet(vet_id):
-    appointments = Appointment.query.filter_by(vet_id=vet_id).all()
-    return jsonify([a.to_dict() for a in appointments])
+    fields = parse_fields(Appointment)
+    query = appointment_query(fields, Appointment.date).filter_by(vet_id=vet_id)
+    page = paginate(query, Appointment.date, Appointment.id)
+    return jsonify(page.to_response(serializer(fields)))
 
 @bp.route('/appointments/vet/me', methods=['GET'])
 @jwt_required()
+@read_only
 def api_get_my_appointments():
     current_user_id = int(get_jwt_identity())
-    appointments = Appointment.query.filter_by(vet_id=current_user_id).all()
-    return jsonify([a.to_dict() for a in appointments])
+    fields = parse_fields(Appointment)
+    query = appointment_query(fields, Appointment.date).filter_by(vet_id=current_user_id)
+    page = paginate(query, Appointment.date, Appointment.id)
+    return jsonify(page.to_response(serializer(fields)))
+
+# Disponibilidad de veterinarios (Availability)
+@bp.route('/availability', methods=['GET'])
+@jwt_required()
+def api_availability():
+    vet_id = request.args.get('vet_id', type=int)
+    service_id = request.args.get('service_id', type=int)
+    date = request.args.get('date')
+    if not vet_id or not service_id or not date:
+        return jsonify(error_response("Los parámetros 'vet_id', 'date' y 'service_id' son obligatorios")), 400
+    try:
+        day = datetime.strptime(date, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify(error_response("Formato de fecha inválido (YYYY-MM-DD)")), 400
+    service = Service.query.get_or_404(service_id)
+    return jsonify({
+        "vet_id": vet_id,
+        "date": day.isoformat(),
+        "service_id": service.id,
+        "duration_minutes": service.duration_minutes,
+        "slots": available_slots(vet_id, day, service.duration_minutes)
+    })
 
 # Servicios (Services)
 @bp.route('/services', methods=['GET'])
 @jwt_required()
 def api_get_services():
-    services = Service.query.order_by(Service.id.desc()).all()
-    return jsonify([service.to_dict() for service in services])
+    fields = parse_fields(Service)
+    def load():
+        query = fields.apply(Service.query) if fields else Service.query
+        services = query.order_by(Service.id.desc()).all()
+        return [serializer(fields)(service) for service in services]
+    return jsonify(cache.get_or_set(cache_key('services'), load))
 
 @bp.route('/services/<int:service_id>', methods=['GET'])
 @jwt_required()
 def api_get_service(service_id):
-    service = Service.query.get_or_404(service_id)
-    return jsonify(service.to_dict())
+    return jsonify(get_serialized(Service, service_id))
 
 @bp.route('/services', methods=['POST'])
 @jwt_required()
@@ -177,10 +416,12 @@ def api_create_service():
             name=data['name'],
             description=data.get('description'),
             price=data['price'],
-            attention_type=data['attention_type']
+            attention_type=data['attention_type'],
+            duration_minutes=data.get('duration_minutes') or 30
         )
         db.session.add(service)
         db.session.commit()
+        cache.invalidate('services')
         return jsonify(success_response(service.to_dict(), "Servicio creado exitosamente")), 201
     except Exception as e:
         return jsonify(error_response(str(e))), 400
@@ -197,7 +438,9 @@ def api_update_service(service_id):
     service.name = data.get('name', service.name)
     service.description = data.get('description', service.description)
     service.price = data.get('price', service.price)
+    service.duration_minutes = data.get('duration_minutes') or service.duration_minutes
     db.session.commit()
+    cache.invalidate('services')
     return jsonify(success_response(service.to_dict(), "Servicio actualizado"))
 
 @bp.route('/services/<int:service_id>', methods=['DELETE'])
@@ -205,10 +448,12 @@ def api_update_service(service_id):
 def api_delete_service(service_id):
     service = Service.query.get_or_404(service_id)
     from app.models import Appointment
-    if Appointment.query.filter_by(service_id=service_id).first():
+    if Appointment.query.filter_by(service_id=service_id).first() or \
+            ArchivedAppointment.query.filter_by(service_id=service_id).first():
         return jsonify({"message": "No se puede eliminar el servicio porque está asociado a citas existentes."}), 400
     db.session.delete(service)
     db.session.commit()
+    cache.invalidate('services')
     return jsonify(success_response(message="Servicio eliminado"))
 
 # Usuarios (Users)
@@ -216,17 +461,19 @@ def api_delete_service(service_id):
 @jwt_required()
 def api_get_users():
     role = request.args.get('role')
-    if role:
-        users = User.query.filter_by(role=role).all()
-    else:
-        users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    fields = parse_fields(User)
+    def load():
+        query = fields.apply(User.query) if fields else User.query
+        if role:
+            query = query.filter_by(role=role)
+        page = paginate(query, User.id)
+        return page.to_response(serializer(fields))
+    return jsonify(cache.get_or_set(cache_key('users'), load))
 
 @bp.route('/users/<int:user_id>', methods=['GET'])
 @jwt_required()
 def api_get_user(user_id):
-    user = User.query.get_or_404(user_id)
-    return jsonify(user.to_dict())
+    return jsonify(get_serialized(User, user_id))
 
 @bp.route('/users', methods=['POST'])
 @jwt_required()
@@ -270,7 +517,13 @@ def api_login():
     if not username or not password:
         return jsonify(error_response("Usuario y contraseña son obligatorios")), 400
     user = User.query.filter_by(username=username).first()
-    if user and user.check_password(password):
+    # Si el pool de hash está saturado responde 503 (ver hasher_busy)
+    valid = user is not None and user.check_password(password)
+    if valid and user.needs_rehash():
+        # Actualiza el hash a los parámetros configurados aprovechando la contraseña en claro
+        user.set_password(password)
+        db.session.commit()
+    if valid:
         access_token = create_access_token(identity=str(user.id), additional_claims={"role": user.role})
         return jsonify(success_response({
             "user": user.to_dict(),
@@ -300,13 +553,16 @@ def api_create_client():
 
 @bp.route('/clients', methods=['GET'])
 @jwt_required()
+@read_only
 def api_get_clients():
-    clients = Client.query.all()
-    return jsonify([client.to_dict() for client in clients])
+    fields = parse_fields(Client)
+    page = paginate(fields.apply(Client.query) if fields else Client.query, Client.id)
+    return jsonify(page.to_response(serializer(fields)))
 
 # Pagos (Payments)
 @bp.route('/payments', methods=['POST'])
 @jwt_required()
+@idempotent
 def api_register_payment():
     data = request.json
     if not data.get('appointment_id'):
@@ -315,19 +571,24 @@ def api_register_payment():
         appointment = register_payment(
             appointment_id=data['appointment_id'],
             payment_method=data.get('payment_method'),
-            payment_amount=data.get('payment_amount')
+            payment_amount=data.get('payment_amount'),
+            version=data.get('version')
         )
         if appointment:
             return jsonify(success_response(appointment.to_dict(), "Pago registrado")), 200
         return jsonify(error_response("Cita no encontrada")), 404
+    except StaleDataError:
+        raise  # 409, ver stale_data_error
     except Exception as e:
         return jsonify(error_response(str(e))), 400
 
 @bp.route('/payments', methods=['GET'])
 @jwt_required()
+@read_only
 def api_get_payments():
-    appointments = Appointment.query.filter_by(paid=True).all()
-    return jsonify([a.to_dict() for a in appointments])
+    fields = parse_fields(Appointment)
+    page = paginate_union(payment_sources(fields))
+    return jsonify(page.to_response(serializer(fields)))
 
 # Historial clínico (Clinical History)
 @bp.route('/clinical-history', methods=['POST'])
@@ -353,26 +614,212 @@ def api_update_clinical_history(history_id):
     if 'observation' in data and not data['observation']:
         return jsonify(error_response("La observación no puede estar vacía")), 400
     history.observation = data.get('observation', history.observation)
+    index_observation(history)
     db.session.commit()
     return jsonify(success_response(history.to_dict(), "Historial clínico actualizado"))
 
+@bp.route('/clinical-history/search', methods=['GET'])
+@jwt_required()
+@read_only
+def api_search_clinical_history():
+    query = request.args.get('q', '')
+    if not search_terms(query):
+        return jsonify(error_response("El parámetro 'q' es obligatorio")), 400
+    limit = parse_limit() or current_app.config.get('PAGINATION_DEFAULT_LIMIT', 100)
+    # Los resultados se ordenan por relevancia: el cursor codifica el desplazamiento
+    offset = decode_cursor(request.args['cursor'], [ClinicalHistory.id])[0] if request.args.get('cursor') else 0
+    if not isinstance(offset, int) or offset < 0:
+        raise PaginationError("Cursor inválido")
+    start, before, error = parse_date_range()
+    if error:
+        return jsonify(error_response(error)), 400
+    matches = search_observations(
+        query,
+        vet_id=request.args.get('vet_id', type=int),
+        start_date=start,
+        before=before,
+        limit=limit + 1,
+        offset=offset
+    )
+    next_cursor = encode_cursor([offset + limit]) if len(matches) > limit else None
+    matches = matches[:limit]
+    fields = parse_fields(ClinicalHistory)
+    ids = [m[0] for m in matches]
+    rows = {h.id: h for h in clinical_history_query((), fields, ClinicalHistory.id).filter(ClinicalHistory.id.in_(ids))}
+    serialize = serializer(fields)
+    results = []
+    for history_id, score, snippet in matches:
+        item = serialize(rows[history_id])
+        item["score"] = score
+        item["snippet"] = snippet
+        results.append(item)
+    return jsonify({"data": results, "next_cursor": next_cursor, "limit": limit})
+
+# --------- Carga inicial de pantallas ---------
+@bp.route('/bootstrap/<screen>', methods=['GET'])
+@jwt_required()
+@read_only
+def api_bootstrap(screen):
+    # Todo lo que necesita una pantalla al abrirse, en una sola petición
+    loader = BOOTSTRAP_SCREENS.get(screen)
+    if loader is None:
+        return jsonify(error_response(f"Pantalla '{screen}' no soportada", 404)), 404
+    return jsonify(loader())
+
+# --------- Búsqueda rápida (typeahead) ---------
+def lookup_limit():
+    # Cantidad de sugerencias pedida con ?limit=, acotada por LOOKUP_MAX_LIMIT
+    limit = request.args.get('limit', current_app.config.get('LOOKUP_DEFAULT_LIMIT', 10), type=int)
+    return max(1, min(limit, current_app.config.get('LOOKUP_MAX_LIMIT', 50)))
+
+@bp.route('/lookup/clients', methods=['GET'])
+@jwt_required()
+@read_only
+def api_lookup_clients():
+    q = request.args.get('q', '').strip()
+    return jsonify(lookup_clients(q, lookup_limit()))
+
+@bp.route('/lookup/pets', methods=['GET'])
+@jwt_required()
+@read_only
+def api_lookup_pets():
+    q = request.args.get('q', '').strip()
+    return jsonify(lookup_pets(q, request.args.get('client_id', type=int), lookup_limit()))
+
 @bp.route('/clinical-history', methods=['GET'])
 @jwt_required()
+@read_only
 def api_get_clinical_history():
     appointment_id = request.args.get('appointment_id')
     pet_id = request.args.get('pet_id')
     vet_id = request.args.get('vet_id')
-    query = ClinicalHistory.query
-    if appointment_id:
-        query = query.filter_by(appointment_id=appointment_id)
-    if pet_id:
-        query = query.filter_by(pet_id=pet_id)
-    if vet_id:
-        query = query.filter_by(vet_id=vet_id)
-    history = query.all()
-    return jsonify([h.to_dict() for h in history])
+    expand, error = parse_choices('expand', CLINICAL_HISTORY_EXPANDS)
+    if error:
+        return jsonify(error_response(error)), 400
+    fields = parse_fields(ClinicalHistory)
+    sources = clinical_history_sources(expand, fields, appointment_id=appointment_id, pet_id=pet_id, vet_id=vet_id)
+    page = paginate_union(sources)
+    return jsonify(page.to_response(serializer(fields, lambda h: h.to_dict(expand))))
+
+# Sincronización incremental (Sync)
+def sync_sources():
+    # Entidades sincronizables: nombre -> (modelo, consulta con relaciones precargadas, serializador)
+    return {
+        'clients': (Client, Client.query, lambda c: c.to_dict()),
+        'pets': (Pet, Pet.query.options(joinedload(Pet.client)), lambda p: p.to_dict()),
+        'appointments': (Appointment, appointment_query(), lambda a: a.to_dict()),
+        'services': (Service, Service.query, lambda s: s.to_dict()),
+        'clinical_history': (ClinicalHistory, clinical_history_query(), lambda h: h.to_dict())
+    }
+
+@bp.route('/sync', methods=['GET'])
+@jwt_required()
+@read_only
+def api_sync():
+    sources = sync_sources()
+    entities, error = parse_choices('entities', sources)
+    if error:
+        return jsonify(error_response(error)), 400
+    since = None
+    if request.args.get('since'):
+        try:
+            since = decode_cursor(request.args['since'], [Client.updated_at])[0]
+        except PaginationError:
+            return jsonify(error_response("Token de sincronización inválido")), 400
+    # El próximo token se toma antes de leer y con un margen hacia atrás, para no perder
+    # filas de transacciones que confirmen después; el cliente puede recibir duplicados
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    next_since = now - timedelta(seconds=current_app.config.get('SYNC_SAFETY_WINDOW', 5))
+    changes, deleted = {}, {}
+    for name in entities or sources:
+        model, query, serialize = sources[name]
+        if since is not None:
+            query = query.filter(model.updated_at >= since)
+        changes[name] = [serialize(row) for row in query.order_by(model.updated_at, model.id)]
+        if since is not None:
+            tombstones = Tombstone.query.filter(
+                Tombstone.entity == model.__tablename__, Tombstone.deleted_at >= since
+            ).order_by(Tombstone.id)
+            deleted[name] = [t.entity_id for t in tombstones]
+    return jsonify({
+        "full": since is None,
+        "changes": changes,
+        "deleted": deleted,
+        "next_token": encode_cursor([next_since])
+    })
+
+# Eventos en streaming (Server-Sent Events)
+@bp.route('/events', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])  # EventSource no envía encabezados: ?jwt=<token>
+def api_events():
+    types, error = parse_choices('types', EVENT_TYPES)
+    if error:
+        return jsonify(error_response(error)), 400
+    vet_id = request.args.get('vet_id')
+    if vet_id == 'me':
+        vet_id = int(get_jwt_identity())
+    elif vet_id is not None:
+        if not vet_id.isdigit():
+            return jsonify(error_response("vet_id inválido")), 400
+        vet_id = int(vet_id)
+    # Al reconectarse, el navegador envía el id del último evento recibido
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if last_event_id is not None and not last_event_id.isdigit():
+        return jsonify(error_response("Last-Event-ID inválido")), 400
+    after_id = int(last_event_id) if last_event_id is not None else events.last_id()
+    response = Response(stream_with_context(events.stream(after_id, vet_id, types)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # sin buffer en nginx
+    return response
+
+# Importación masiva (Bulk)
+@bp.route('/clients/bulk', methods=['POST'])
+@bp.route('/pets/bulk', methods=['POST'], endpoint='api_bulk_pets')
+@bp.route('/appointments/bulk', methods=['POST'], endpoint='api_bulk_appointments')
+@jwt_required()
+def api_bulk_import():
+    # La entidad sale de la URL: /api/<entidad>/bulk
+    entity = request.path.rstrip('/').split('/')[-2]
+    data = request.json
+    rows = data.get('rows') if isinstance(data, dict) else data
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        return jsonify(error_response("Se espera una lista de filas (objetos JSON)")), 400
+    max_rows = current_app.config.get('BULK_MAX_ROWS', 10000)
+    if len(rows) > max_rows:
+        return jsonify(error_response(f"Máximo {max_rows} filas por petición")), 400
+    result = bulk_import(entity, rows, current_app.config.get('BULK_CHUNK_SIZE', 500))
+    status = 201 if result["created"] else 400
+    return jsonify(success_response(result, f"{result['created']} de {result['received']} filas importadas")), status
+
+# Estadísticas de la caché de datos de referencia
+@bp.route('/cache/stats', methods=['GET'])
+@jwt_required()
+def api_cache_stats():
+    return jsonify(cache.stats())
 
 # Manejo de errores API
+@bp.errorhandler(PaginationError)
+def pagination_error(error):
+    return jsonify(error_response(str(error))), 400
+
+@bp.errorhandler(FieldsError)
+def fields_error(error):
+    return jsonify(error_response(str(error))), 400
+
+@bp.errorhandler(HasherBusy)
+def hasher_busy(error):
+    # Pool de hash de contraseñas saturado (login, alta de usuario, cambio de contraseña)
+    db.session.rollback()
+    response = jsonify(error_response("Servidor ocupado, intente nuevamente", 503))
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+@bp.errorhandler(StaleDataError)
+def stale_data_error(error):
+    # Otra petición modificó la cita entre la lectura y la escritura (o el cliente envió una versión vieja)
+    db.session.rollback()
+    return jsonify(error_response("La cita fue modificada por otra operación; vuelva a cargarla e intente de nuevo", 409)), 409
+
 @bp.app_errorhandler(404)
 def not_found(error):
     if request.path.startswith('/api/'):
@@ -388,40 +835,139 @@ def internal_error(error):
 # Reportes de la API
 @bp.route('/reports/payments', methods=['GET'])
 @jwt_required()
+@read_only
 def api_report_payments():
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    query = Appointment.query.filter_by(paid=True)
-    if start_date:
-        query = query.filter(Appointment.payment_date >= start_date)
-    if end_date:
-        query = query.filter(Appointment.payment_date <= end_date)
-    payments = query.all()
-    total = sum(a.payment_amount or 0 for a in payments)
-    return jsonify({
-        "total_pagado": total,
-        "pagos": [a.to_dict() for a in payments]
-    })
+    return report_payments()
 
 @bp.route('/reports/appointments', methods=['GET'])
 @jwt_required()
+@read_only
 def api_report_appointments():
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    query = Appointment.query
-    if start_date:
-        query = query.filter(Appointment.date >= start_date)
-    if end_date:
-        query = query.filter(Appointment.date <= end_date)
-    appointments = query.all()
-    return jsonify([a.to_dict() for a in appointments])
+    return report_appointments()
 
 @bp.route('/reports/clinical-history', methods=['GET'])
 @jwt_required()
+@read_only
 def api_report_clinical_history():
+    return report_clinical_history()
+
+# Los reportes leen sus parámetros de request.args: los atiende la ruta o un trabajo en segundo plano
+def report_payments():
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    start, before, error = parse_date_range()
+    if error:
+        return jsonify(error_response(error)), 400
+    group_by, error = parse_choices('group_by', PAYMENT_SUMMARY_GROUPS)
+    if error:
+        return jsonify(error_response(error)), 400
+    fmt, error = parse_export_format()
+    if error:
+        return jsonify(error_response(error)), 400
+    fields = parse_fields(Appointment)
+    sources = payment_sources(fields, start, before)
+    if fmt:
+        # Pagos activos y archivados combinados por fecha de pago
+        return export(sources, fmt, fields, APPOINTMENT_EXPORT_FIELDS, 'pagos')
+    include_rows = request.args.get('include_rows', 'false').lower() == 'true'
+    include_rows = include_rows or 'limit' in request.args or 'cursor' in request.args
+    # Totales y desgloses se calculan en SQL; con rangos de días completos, desde el acumulado diario
+    use_rollup = current_app.config.get('REVENUE_ROLLUP_REPORTS', True) and \
+        all(parse_day(value) for value in (start_date, end_date) if value)
+    if use_rollup:
+        response = revenue_summary(parse_day(start_date), parse_day(end_date), group_by)
+    else:
+        response = payments_summary(start, before, group_by)
+    # Las filas solo se cargan si se piden
+    if include_rows:
+        page = paginate_union(sources)
+        response["pagos"] = [serializer(fields)(a) for a in page.items]
+        if page.paginated:
+            response["next_cursor"] = page.next_cursor
+            response["limit"] = page.limit
+    return jsonify(response)
+
+def report_appointments():
+    start, before, error = parse_date_range()
+    if error:
+        return jsonify(error_response(error)), 400
+    fmt, error = parse_export_format()
+    if error:
+        return jsonify(error_response(error)), 400
+    fields = parse_fields(Appointment)
+    query = appointment_query(fields, Appointment.date)
+    if start:
+        query = query.filter(Appointment.date >= start)
+    if before:
+        query = query.filter(Appointment.date < before)
+    if fmt:
+        query = query.order_by(Appointment.date, Appointment.id)
+        return export(query, fmt, fields, APPOINTMENT_EXPORT_FIELDS, 'citas')
+    page = paginate(query, Appointment.date, Appointment.id)
+    return jsonify(page.to_response(serializer(fields)))
+
+def report_clinical_history():
     pet_id = request.args.get('pet_id')
-    query = ClinicalHistory.query
-    if pet_id:
-        query = query.filter_by(pet_id=pet_id)
-    history = query.all()
-    return jsonify([h.to_dict() for h in history])
\ No newline at end of file
+    expand, error = parse_choices('expand', CLINICAL_HISTORY_EXPANDS)
+    if error:
+        return jsonify(error_response(error)), 400
+    fmt, error = parse_export_format()
+    if error:
+        return jsonify(error_response(error)), 400
+    fields = parse_fields(ClinicalHistory)
+    sources = clinical_history_sources(expand, fields, pet_id=pet_id)
+    serialize = serializer(fields, lambda h: h.to_dict(expand))
+    if fmt:
+        # Observaciones activas y archivadas combinadas por fecha
+        return export(sources, fmt, fields, CLINICAL_HISTORY_EXPORT_FIELDS, 'historial_clinico', serialize)
+    page = paginate_union(sources)
+    return jsonify(page.to_response(serialize))
+
+jobs.register('payments', '/api/reports/payments', report_payments)
+jobs.register('appointments', '/api/reports/appointments', report_appointments)
+jobs.register('clinical-history', '/api/reports/clinical-history', report_clinical_history)
+
+# --------- Reportes en segundo plano ---------
+@bp.route('/jobs', methods=['POST'])
+@jwt_required()
+def api_submit_job():
+    data = request.get_json() or {}
+    report = data.get('report')
+    params = data.get('params') or {}
+    if report not in jobs.reports:
+        return jsonify(error_response(f"Reporte no soportado: {report} (use {', '.join(jobs.reports)})")), 400
+    if not isinstance(params, dict):
+        return jsonify(error_response("'params' debe ser un objeto")), 400
+    params = {key: str(value) for key, value in params.items() if value is not None}
+    try:
+        job = jobs.submit(report, params, int(get_jwt_identity()))
+    except JobsBusy:
+        return jsonify(error_response("Hay demasiados reportes en cola, intente más tarde", 503)), 503
+    return jsonify(success_response(job.to_dict(), "Reporte en cola")), 202
+
+def get_own_job(job_id):
+    # Cada usuario solo ve sus propios trabajos
+    job = ReportJob.query.filter_by(id=job_id, user_id=int(get_jwt_identity())).first_or_404()
+    return jobs.refresh(job)
+
+@bp.route('/jobs', methods=['GET'])
+@jwt_required()
+def api_get_jobs():
+    query = ReportJob.query.filter_by(user_id=int(get_jwt_identity()))
+    page = paginate(query, ReportJob.id)
+    return jsonify(page.to_response())
+
+@bp.route('/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def api_get_job(job_id):
+    return jsonify(get_own_job(job_id).to_dict())
+
+@bp.route('/jobs/<int:job_id>/result', methods=['GET'])
+@jwt_required()
+def api_get_job_result(job_id):
+    job = get_own_job(job_id)
+    if job.status != 'terminado':
+        return jsonify(error_response(f"El reporte no está listo (estado: {job.status})", 409)), 409
+    if not job.result_path or not os.path.exists(job.result_path):
+        return jsonify(error_response("El resultado ya no está disponible", 410)), 410
+    return send_file(job.result_path, mimetype=job.mimetype, as_attachment=True, download_name=job.filename)
@@ -0,0 +1,32 @@
+"""
+Mueve las citas cerradas antiguas y sus observaciones clínicas a las tablas de archivo.
+Se puede programar (cron) fuera del horario de atención: cada lote es una transacción corta.
+
+Uso:
+    python -m app.scripts.archive_appointments                # horizonte ARCHIVE_AFTER_DAYS
+    python -m app.scripts.archive_appointments --days 365 --batch-size 500
+    python -m app.scripts.archive_appointments --dry-run
+"""
+
+import argparse
+
+from app import create_app
+from app.archive import archive_closed, horizon, pending_count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Archivar citas cerradas antiguas y sus observaciones')
+    parser.add_argument('--days', type=int, default=None, help='Antigüedad mínima en días (por defecto ARCHIVE_AFTER_DAYS)')
+    parser.add_argument('--batch-size', type=int, default=None, help='Citas por lote (por defecto ARCHIVE_BATCH_SIZE)')
+    parser.add_argument('--max-batches', type=int, default=None, help='Detenerse tras N lotes')
+    parser.add_argument('--dry-run', action='store_true', help='Solo contar las citas archivables')
+    args = parser.parse_args()
+    app = create_app()
+    with app.app_context():
+        before = horizon(args.days if args.days is not None else app.config['ARCHIVE_AFTER_DAYS'])
+        if args.dry_run:
+            print(f'{pending_count(before)} citas anteriores a {before:%Y-%m-%d} para archivar')
+        else:
+            batch_size = args.batch_size or app.config['ARCHIVE_BATCH_SIZE']
+            appointments, notes = archive_closed(before, batch_size, args.max_batches)
+            print(f'{appointments} citas y {notes} observaciones archivadas (anteriores a {before:%Y-%m-%d})')
@@ -0,0 +1,61 @@
+"""
+Mide el throughput de /api/login con los parámetros de hash configurados.
+Crea usuarios en una base SQLite temporal, lanza logins concurrentes con el cliente de
+prueba de Flask y reporta logins por segundo, en total y por núcleo del pool de hash.
+
+Uso:
+    python -m app.scripts.bench_login [--users 20] [--logins 200] [--threads 16]
+    PASSWORD_HASH_METHOD=pbkdf2:sha256:600000 python -m app.scripts.bench_login
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def bench_login(users, logins, threads):
+    from app import create_app, db, hasher
+    from app.models import User
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        for i in range(users):
+            user = User(username=f'bench{i}', email=f'bench{i}@example.com', role='recepcionista')
+            user.set_password('bench-password')
+            db.session.add(user)
+        db.session.commit()
+
+    def login(i):
+        client = app.test_client()
+        response = client.post('/api/login', json={'username': f'bench{i % users}', 'password': 'bench-password'})
+        return response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+
+    ok = statuses.count(200)
+    per_second = ok / elapsed
+    cores = min(hasher.workers, os.cpu_count() or 1)
+    print(f'Método de hash:     {hasher.method}')
+    print(f'Hilos de hash:      {hasher.workers} (núcleos usados: {cores})')
+    print(f'Logins exitosos:    {ok}/{logins} ({statuses.count(503)} rechazados por saturación)')
+    print(f'Tiempo total:       {elapsed:.2f} s')
+    print(f'Logins/s:           {per_second:.1f}')
+    print(f'Logins/s por núcleo: {per_second / cores:.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de login')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+    # Base temporal en archivo (la configuración se lee al crear la app)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        bench_login(args.users, args.logins, args.threads)
@@ -0,0 +1,299 @@
+"""
+Benchmark de los endpoints de app/routes.py con el cliente de prueba de Flask.
+Por cada endpoint mide la latencia (mediana y p95 de --repeat llamadas), la cantidad de
+sentencias SQL y el pico de memoria de Python (tracemalloc, en una llamada aparte), y compara
+con una línea base guardada: termina con código 1 si algún endpoint empeora más que la tolerancia.
+
+Sin DATABASE_URL usa una base SQLite temporal llenada con app/scripts/seed_data.py (--scale);
+con DATABASE_URL usa esa base, que ya debe tener datos sintéticos. Los escenarios de escritura
+agregan algunas filas por corrida (clientes, mascotas, citas, observaciones).
+
+Uso:
+    python -m app.scripts.bench_routes --scale 0.01 --save-baseline
+    python -m app.scripts.bench_routes --scale 0.01
+    DATABASE_URL=sqlite:////tmp/bench.db python -m app.scripts.bench_routes --only reports --repeat 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import date, timedelta
+from random import Random
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BASELINE = 'bench_baseline.json'
+
+
+def scenarios(ids):
+    """
+    Escenarios del benchmark: (nombre, función(cliente, estado) -> respuesta[, preparación]).
+    Los de escritura se ejecutan en orden y comparten el estado (ids creados); la preparación
+    opcional corre antes de cada llamada, fuera de la medición (p. ej. crear lo que se elimina).
+    """
+    rng = Random()
+    month = date.fromisoformat(ids["last_payment"]) - timedelta(days=30)
+
+    def get(url):
+        return lambda c, state: c.get(url.format(**ids))
+
+    def create_pet(c, state):
+        response = c.post('/api/pets', json={"name": 'Bench', "species": 'perro', "breed": 'Mestizo',
+                                             "age": 2, "client_id": state["client_id"]})
+        state["pet_id"] = response.get_json()["data"]["id"]
+        return response
+
+    def create_client(c, state):
+        response = c.post('/api/clients', json={"name": 'Cliente Bench', "email": f'{uuid.uuid4().hex}@bench.test'})
+        state["client_id"] = response.get_json()["data"]["id"]
+        return response
+
+    def create_appointment(c, state):
+        # Día lejano al azar para no chocar con citas de corridas anteriores
+        day = date(2200, 1, 1) + timedelta(days=rng.randrange(36_500))
+        response = c.post('/api/appointments', json={
+            "client_id": state["client_id"], "pet_id": state["pet_id"], "vet_id": ids["vet_id"],
+            "service_id": ids["service_id"], "date": day.isoformat(), "time": '10:00'
+        })
+        state["appointment_id"] = response.get_json()["data"]["id"]
+        return response
+
+    def create_observation(c, state):
+        response = c.post('/api/clinical-history', json={
+            "pet_id": state["pet_id"], "appointment_id": state["appointment_id"],
+            "observation": 'Control de benchmark, paciente sano.'
+        })
+        state["history_id"] = response.get_json()["data"]["id"]
+        return response
+
+    def create_service(c, state):
+        response = c.post('/api/services', json={"name": 'Servicio bench', "price": 10, "attention_type": 'presencial'})
+        state["new_service_id"] = response.get_json()["data"]["id"]
+        return response
+
+    def create_user(c, state):
+        response = c.post('/api/users', json={"username": f'bench-{uuid.uuid4().hex[:12]}',
+                                              "email": f'{uuid.uuid4().hex}@bench.test',
+                                              "role": 'recepcionista', "password": 'bench-password'})
+        state["new_user_id"] = response.get_json()["data"]["id"]
+        return response
+
+    def bulk_clients(c, state):
+        return c.post('/api/clients/bulk', json=[
+            {"name": f'Bulk {n}', "email": f'{uuid.uuid4().hex}@bench.test'} for n in range(100)
+        ])
+
+    return [
+        ("GET /api/pets", get('/api/pets?limit=100')),
+        ("GET /api/pets?client_id", get('/api/pets?client_id={client_id}')),
+        ("GET /api/pets/<id>", get('/api/pets/{pet_id}')),
+        ("GET /api/appointments", get('/api/appointments?limit=100')),
+        ("GET /api/appointments/<id>", get('/api/appointments/{appointment_id}')),
+        ("GET /api/appointments/vet/<id>", get('/api/appointments/vet/{vet_id}?limit=100')),
+        ("GET /api/appointments/vet/me", get('/api/appointments/vet/me?limit=100')),
+        ("GET /api/availability", get('/api/availability?vet_id={vet_id}&service_id={service_id}&date={last_payment}')),
+        ("GET /api/services", get('/api/services')),
+        ("GET /api/services/<id>", get('/api/services/{service_id}')),
+        ("GET /api/users?role", get('/api/users?role=veterinario')),
+        ("GET /api/users/<id>", get('/api/users/{vet_id}')),
+        ("GET /api/clients", get('/api/clients?limit=100')),
+        ("GET /api/payments", get('/api/payments?limit=100')),
+        ("GET /api/clinical-history", get('/api/clinical-history?limit=100')),
+        ("GET /api/clinical-history?pet_id", get('/api/clinical-history?pet_id={pet_id}')),
+        ("GET /api/clinical-history/search", get('/api/clinical-history/search?q=parvovirus&limit=20')),
+        ("GET /api/bootstrap/appointments", get('/api/bootstrap/appointments')),
+        ("GET /api/bootstrap/payments", get('/api/bootstrap/payments')),
+        ("GET /api/lookup/clients", get('/api/lookup/clients?q=mar')),
+        ("GET /api/lookup/pets", get('/api/lookup/pets?q=lu')),
+        ("GET /api/sync?since", get('/api/sync?since={sync_token}')),
+        ("GET /api/cache/stats", get('/api/cache/stats')),
+        ("GET /api/reports/payments", get('/api/reports/payments?group_by=month,service,vet,payment_method')),
+        ("GET /api/reports/payments?format=csv",
+         get(f'/api/reports/payments?format=csv&start_date={month}&end_date={ids["last_payment"]}')),
+        ("GET /api/reports/appointments",
+         get(f'/api/reports/appointments?limit=100&start_date={month}&end_date={ids["last_payment"]}')),
+        ("GET /api/reports/clinical-history?format=ndjson",
+         get('/api/reports/clinical-history?format=ndjson&pet_id={pet_id}')),
+        ("POST /api/login", lambda c, state: c.post('/api/login', json={"username": 'admin', "password": 'bench-password'})),
+        ("POST /api/clients", create_client),
+        ("POST /api/pets", create_pet),
+        ("PUT /api/pets/<id>", lambda c, state: c.put(f'/api/pets/{state["pet_id"]}', json={"age": 3})),
+        ("POST /api/appointments", create_appointment),
+        ("PUT /api/appointments/<id>",
+         lambda c, state: c.put(f'/api/appointments/{state["appointment_id"]}', json={"status": 'atendida'})),
+        ("POST /api/payments", lambda c, state: c.post('/api/payments', json={
+            "appointment_id": state["appointment_id"], "payment_method": 'efectivo', "payment_amount": 50})),
+        ("POST /api/clinical-history", create_observation),
+        ("PUT /api/clinical-history/<id>", lambda c, state: c.put(
+            f'/api/clinical-history/{state["history_id"]}', json={"observation": 'Control actualizado'})),
+        ("POST /api/clients/bulk", bulk_clients),
+        ("POST /api/services", create_service),
+        ("PUT /api/services/<id>", lambda c, state: c.put(f'/api/services/{state["new_service_id"]}', json={"price": 12})),
+        ("DELETE /api/services/<id>", lambda c, state: c.delete(f'/api/services/{state["new_service_id"]}'),
+         create_service),
+        ("POST /api/users", create_user),
+        ("PUT /api/users/<id>/password", lambda c, state: c.put(
+            f'/api/users/{state["new_user_id"]}/password', json={"new_password": 'otra-password'})),
+        ("DELETE /api/users/<id>", lambda c, state: c.delete(f'/api/users/{state["new_user_id"]}'), create_user),
+        ("DELETE /api/appointments/<id>",
+         lambda c, state: c.delete(f'/api/appointments/{state["appointment_id"]}'), create_appointment),
+    ]
+
+
+def sample_ids(app):
+    # Ids existentes para los endpoints con parámetros
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import func
+    from app import db
+    from app.models import Appointment, ClinicalHistory, Service, User
+
+    with app.app_context():
+        admin = User.query.filter_by(role='admin').order_by(User.id).first()
+        history = ClinicalHistory.query.order_by(ClinicalHistory.id).first()
+        last_payment = db.session.query(func.max(Appointment.payment_date)).scalar()
+        token = create_access_token(identity=str(admin.id), additional_claims={"role": admin.role})
+        return {
+            "token": token,
+            "vet_id": User.query.filter_by(role='veterinario').order_by(User.id).first().id,
+            "service_id": Service.query.order_by(Service.id).first().id,
+            "pet_id": history.pet_id,
+            "client_id": history.pet.client_id,
+            "appointment_id": history.appointment_id or Appointment.query.order_by(Appointment.id).first().id,
+            "last_payment": last_payment.date().isoformat(),
+        }
+
+
+def run(app, repeat, only=None):
+    """
+    Ejecuta los escenarios y devuelve {nombre: métricas}.
+    Cada escenario se llama una vez para calentar, --repeat veces para medir latencia y consultas
+    y una vez más con tracemalloc para el pico de memoria.
+    """
+    ids = sample_ids(app)
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {ids["token"]}'
+    ids["sync_token"] = client.get('/api/sync?entities=services').get_json()["next_token"]
+
+    queries = [0]
+
+    def count(*args):
+        queries[0] += 1
+    event.listen(Engine, 'after_cursor_execute', count)
+
+    results = {}
+    state = {"client_id": ids["client_id"], "pet_id": ids["pet_id"]}
+    try:
+        for name, call, *setup in scenarios(ids):
+            if only and not any(word in name for word in only):
+                continue
+
+            def measure():
+                for prepare in setup:
+                    prepare(client, state)
+                queries[0] = 0
+                started = time.perf_counter()
+                response = call(client, state)
+                response.get_data()  # consume las respuestas en streaming
+                return (time.perf_counter() - started) * 1000, queries[0], response.status_code
+
+            measure()
+            samples = [measure() for _ in range(repeat)]
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+            measure()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            latencies = sorted(ms for ms, _, _ in samples)
+            results[name] = {
+                "p50_ms": round(statistics.median(latencies), 2),
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+                "queries": max(q for _, q, _ in samples),
+                "peak_kb": round(peak / 1024, 1),
+                "status": samples[-1][2],
+            }
+    finally:
+        event.remove(Engine, 'after_cursor_execute', count)
+    return results
+
+
+def compare(results, baseline, tolerance, min_ms, min_kb):
+    # Lista de regresiones respecto de la línea base (latencia, consultas, memoria o código HTTP)
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if current["status"] != base["status"]:
+            regressions.append(f'{name}: código {base["status"]} -> {current["status"]}')
+        if current["queries"] > base["queries"]:
+            regressions.append(f'{name}: consultas {base["queries"]} -> {current["queries"]}')
+        if current["p50_ms"] > base["p50_ms"] * (1 + tolerance) and current["p50_ms"] - base["p50_ms"] > min_ms:
+            regressions.append(f'{name}: latencia p50 {base["p50_ms"]} ms -> {current["p50_ms"]} ms')
+        if current["peak_kb"] > base["peak_kb"] * (1 + tolerance) and current["peak_kb"] - base["peak_kb"] > min_kb:
+            regressions.append(f'{name}: memoria pico {base["peak_kb"]} KB -> {current["peak_kb"]} KB')
+    return regressions
+
+
+def report(results, baseline):
+    print(f'{"Endpoint":48} {"p50 ms":>9} {"p95 ms":>9} {"SQL":>5} {"pico KB":>10} {"HTTP":>5}  {"p50 base":>9}')
+    for name, r in results.items():
+        base = baseline.get(name, {}).get("p50_ms", '')
+        print(f'{name:48} {r["p50_ms"]:>9} {r["p95_ms"]:>9} {r["queries"]:>5} {r["peak_kb"]:>10} {r["status"]:>5}  {base:>9}')
+
+
+def main(args):
+    from app import create_app
+    from app.scripts.seed_data import generate
+
+    app = create_app('production')
+    if args.seed:
+        with app.app_context():
+            generate(scale=args.scale)
+
+    results = run(app, args.repeat, args.only)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    report(results, baseline)
+    errors = [f'{name}: código {r["status"]}' for name, r in results.items() if r["status"] >= 500]
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({"scale": args.scale if args.seed else None, "repeat": args.repeat, "results": results}, f, indent=2)
+        print(f'Línea base guardada en {args.baseline}')
+    elif baseline:
+        errors += compare(results, baseline, args.tolerance, args.min_ms, args.min_kb)
+    else:
+        print(f'No hay línea base en {args.baseline} (usar --save-baseline)')
+    for error in errors:
+        print(f'REGRESIÓN {error}')
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de endpoints')
+    parser.add_argument('--scale', type=float, default=0.01, help='Volumen de la base temporal (ver seed_data)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', nargs='*', help='Solo los endpoints cuyo nombre contiene alguno de estos textos')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Empeoramiento relativo admitido')
+    parser.add_argument('--min-ms', type=float, default=5.0, help='Diferencia de latencia por debajo de la cual no se reporta')
+    parser.add_argument('--min-kb', type=float, default=256.0, help='Diferencia de memoria por debajo de la cual no se reporta')
+    args = parser.parse_args()
+    if os.environ.get('DATABASE_URL'):
+        args.seed = False
+        sys.exit(main(args))
+    # Base temporal en archivo (la configuración se lee al crear la app)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        args.seed = True
+        sys.exit(main(args))
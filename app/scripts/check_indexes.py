@@ -0,0 +1,89 @@
+"""
+Verifica que las consultas filtradas de app/routes.py usen índices.
+Ejecuta EXPLAIN sobre cada consulta contra la base de datos configurada (sembrada)
+y termina con código 1 si alguna hace un recorrido completo de tabla.
+
+Uso:
+    python -m app.scripts.check_indexes [development|testing|production]
+"""
+
+import sys
+
+from sqlalchemy.orm import joinedload
+
+from app import create_app, db
+from app.models import Pet, ClinicalHistory, User, Appointment
+from app.routes import appointment_query, clinical_history_query
+
+
+def route_queries():
+    # Consultas equivalentes a las de cada endpoint, con filtros y ordenamiento de la paginación
+    return [
+        ("GET /api/pets?client_id=",
+         Pet.query.options(joinedload(Pet.client)).filter_by(client_id=1).order_by(Pet.id)),
+        ("GET /api/appointments/vet/<id>",
+         appointment_query().filter_by(vet_id=1).order_by(Appointment.date, Appointment.id)),
+        ("GET /api/appointments?limit=",
+         appointment_query().order_by(Appointment.date, Appointment.id).limit(100)),
+        ("GET /api/payments",
+         appointment_query().filter_by(paid=True).order_by(Appointment.payment_date, Appointment.id)),
+        ("GET /api/reports/payments",
+         appointment_query().filter_by(paid=True)
+         .filter(Appointment.payment_date >= '2025-01-01', Appointment.payment_date <= '2025-12-31')),
+        ("GET /api/reports/appointments",
+         appointment_query()
+         .filter(Appointment.date >= '2025-01-01', Appointment.date <= '2025-12-31')),
+        ("GET /api/clinical-history?pet_id=",
+         clinical_history_query().filter_by(pet_id=1).order_by(ClinicalHistory.date, ClinicalHistory.id)),
+        ("GET /api/clinical-history?appointment_id=",
+         clinical_history_query().filter_by(appointment_id=1)),
+        ("GET /api/clinical-history?vet_id=",
+         clinical_history_query().filter_by(vet_id=1).order_by(ClinicalHistory.date, ClinicalHistory.id)),
+        ("GET /api/users?role=",
+         User.query.filter_by(role='veterinario').order_by(User.id)),
+        ("DELETE /api/services/<id>",
+         Appointment.query.filter_by(service_id=1).limit(1)),
+    ]
+
+
+def explain(query):
+    # Devuelve las filas del plan de ejecución de la consulta según el motor
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    prefix = 'EXPLAIN QUERY PLAN ' if db.engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    with db.engine.connect() as connection:
+        result = connection.exec_driver_sql(prefix + str(compiled), params)
+        return [dict(row._mapping) for row in result]
+
+
+def full_scans(plan):
+    # Filas del plan que recorren una tabla completa
+    if db.engine.dialect.name == 'sqlite':
+        return [row['detail'] for row in plan
+                if row['detail'].startswith('SCAN') and 'INDEX' not in row['detail']]
+    return [f"{row['table']} (type={row['type']})" for row in plan if row['type'] == 'ALL']
+
+
+def check_indexes():
+    failures = 0
+    for name, query in route_queries():
+        scans = full_scans(explain(query))
+        if scans:
+            failures += 1
+            print(f'FULL SCAN  {name}: {"; ".join(scans)}')
+        else:
+            print(f'OK         {name}')
+    return failures
+
+
+if __name__ == '__main__':
+    config_name = sys.argv[1] if len(sys.argv) > 1 else 'default'
+    app = create_app(config_name)
+    with app.app_context():
+        if config_name == 'testing':
+            # La base en memoria de testing arranca vacía
+            db.create_all()
+        sys.exit(1 if check_indexes() else 0)
@@ -0,0 +1,26 @@
+"""
+Recalcula el acumulado diario de ingresos (daily_revenue) desde las citas pagadas.
+Sirve para la carga inicial y para reparar el acumulado si se modificaron pagos por fuera
+de la API (SQL manual, restauración de un respaldo, etc.).
+
+Uso:
+    python -m app.scripts.rebuild_revenue
+    python -m app.scripts.rebuild_revenue --start 2025-01-01 --end 2025-01-31
+"""
+
+import argparse
+from datetime import date
+
+from app import create_app
+from app.controllers import rebuild_daily_revenue
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recalcular el acumulado diario de ingresos')
+    parser.add_argument('--start', type=date.fromisoformat, default=None, help='Primer día (YYYY-MM-DD)')
+    parser.add_argument('--end', type=date.fromisoformat, default=None, help='Último día, inclusive (YYYY-MM-DD)')
+    args = parser.parse_args()
+    app = create_app()
+    with app.app_context():
+        groups = rebuild_daily_revenue(args.start, args.end)
+        print(f'{groups} grupos recalculados')
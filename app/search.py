@@ -0,0 +1,134 @@
+"""
+Búsqueda de texto completo sobre las observaciones del historial clínico.
+- MySQL: índice FULLTEXT sobre clinical_history.observation (InnoDB lo mantiene solo).
+- SQLite: tabla virtual FTS5 clinical_history_fts (rowid = id del historial), que se
+  actualiza con index_observation() al crear o editar una observación.
+Todos los términos son obligatorios y se buscan por prefijo ("parvo" encuentra "parvovirus").
+"""
+
+import re
+
+from sqlalchemy import DDL, DateTime, bindparam, event, text
+
+from app import db
+from app.models import ClinicalHistory
+
+FTS_TABLE = 'clinical_history_fts'
+FULLTEXT_INDEX = 'ix_clinical_history_observation_ft'
+
+# La tabla FTS5 se crea junto con clinical_history en SQLite (db.create_all en pruebas e instalaciones chicas)
+event.listen(
+    ClinicalHistory.__table__, 'after_create',
+    DDL(f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(observation)').execute_if(dialect='sqlite')
+)
+event.listen(
+    ClinicalHistory.__table__, 'after_create',
+    DDL(f'CREATE FULLTEXT INDEX {FULLTEXT_INDEX} ON clinical_history (observation)').execute_if(dialect='mysql')
+)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Autogenerate de Alembic ignora los objetos de búsqueda, que no están en los modelos
+    return not (reflected and name and (name.startswith(FTS_TABLE) or name == FULLTEXT_INDEX))
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def index_observation(history):
+    """
+    Actualiza la entrada de búsqueda de una observación, dentro de la transacción en curso.
+    En MySQL no hace nada: el índice FULLTEXT se mantiene con la tabla.
+    """
+    if _dialect() != 'sqlite':
+        return
+    db.session.execute(text(f'DELETE FROM {FTS_TABLE} WHERE rowid = :id'), {"id": history.id})
+    db.session.execute(
+        text(f'INSERT INTO {FTS_TABLE} (rowid, observation) VALUES (:id, :observation)'),
+        {"id": history.id, "observation": history.observation}
+    )
+
+
+def unindex_observations(ids):
+    """
+    Quita observaciones de la búsqueda de SQLite (al archivarlas), dentro de la transacción en curso.
+    En MySQL no hace nada: el índice FULLTEXT se mantiene con la tabla.
+    """
+    if _dialect() != 'sqlite' or not ids:
+        return
+    statement = text(f'DELETE FROM {FTS_TABLE} WHERE rowid IN :ids').bindparams(bindparam('ids', expanding=True))
+    db.session.execute(statement, {"ids": list(ids)})
+
+
+def reindex_observations():
+    """
+    Reconstruye la tabla de búsqueda de SQLite desde clinical_history (tras cargas masivas
+    con INSERT directo, que no pasan por index_observation). En MySQL no hace nada.
+    """
+    if _dialect() != 'sqlite':
+        return
+    db.session.execute(text(f'DELETE FROM {FTS_TABLE}'))
+    db.session.execute(text(f'INSERT INTO {FTS_TABLE} (rowid, observation) SELECT id, observation FROM clinical_history'))
+    db.session.commit()
+
+
+def search_terms(query):
+    # Palabras de la consulta, sin operadores ni signos del motor de búsqueda
+    return re.findall(r'\w+', query.lower())
+
+
+def _snippet(observation, terms, width=160):
+    # Fragmento de la observación alrededor del primer término encontrado, con los términos marcados
+    lower = observation.lower()
+    positions = [lower.find(term) for term in terms if lower.find(term) >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    fragment = observation[start:start + width]
+    for term in terms:
+        fragment = re.sub(rf'(?i)\b({re.escape(term)}\w*)', r'[\1]', fragment)
+    return ('…' if start > 0 else '') + fragment + ('…' if start + width < len(observation) else '')
+
+
+def search_observations(query, vet_id=None, start_date=None, before=None, limit=20, offset=0):
+    """
+    Busca observaciones por relevancia.
+    :param start_date: Fecha mínima, incluida (datetime)
+    :param before: Fecha límite, excluida (datetime)
+    :return: Lista de (id, puntaje, fragmento) ordenada de más a menos relevante
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    params = {"limit": limit, "offset": offset}
+    filters = []
+    if vet_id:
+        filters.append('ch.vet_id = :vet_id')
+        params["vet_id"] = vet_id
+    if start_date:
+        filters.append('ch.date >= :start_date')
+        params["start_date"] = start_date
+    if before:
+        filters.append('ch.date < :before')
+        params["before"] = before
+    where = ''.join(f' AND {f}' for f in filters)
+    # Las fechas se envían con el mismo formato que usa la columna DateTime
+    dates = [bindparam(name, type_=DateTime) for name in ('start_date', 'before') if name in params]
+
+    if _dialect() == 'sqlite':
+        params["q"] = ' '.join(f'"{term}"*' for term in terms)
+        sql = (
+            f"SELECT ch.id, -bm25({FTS_TABLE}) AS score, "
+            f"snippet({FTS_TABLE}, 0, '[', ']', '…', 24) AS snippet "
+            f"FROM {FTS_TABLE} JOIN clinical_history ch ON ch.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :q{where} ORDER BY score DESC, ch.id DESC LIMIT :limit OFFSET :offset"
+        )
+        return [tuple(row) for row in db.session.execute(text(sql).bindparams(*dates), params)]
+
+    params["q"] = ' '.join(f'+{term}*' for term in terms)
+    sql = (
+        "SELECT ch.id, MATCH(ch.observation) AGAINST (:q IN BOOLEAN MODE) AS score, ch.observation "
+        "FROM clinical_history ch "
+        f"WHERE MATCH(ch.observation) AGAINST (:q IN BOOLEAN MODE){where} "
+        "ORDER BY score DESC, ch.id DESC LIMIT :limit OFFSET :offset"
+    )
+    return [(row[0], row[1], _snippet(row[2], terms)) for row in db.session.execute(text(sql).bindparams(*dates), params)]
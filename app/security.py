@@ -0,0 +1,71 @@
+"""
+Hash y verificación de contraseñas en un pool acotado de hilos.
+El cálculo del hash (scrypt/pbkdf2 de hashlib) libera el GIL, así que corre en paralelo en los
+hilos del pool sin ocupar más de PASSWORD_HASH_WORKERS núcleos; si hay demasiadas
+verificaciones en espera, se rechazan en lugar de bloquear a los workers del servidor.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    """El pool de verificación está saturado."""
+
+
+class PasswordHasher:
+    """
+    Calcula y verifica hashes de contraseña con los parámetros de PASSWORD_HASH_METHOD.
+    """
+
+    def __init__(self, app=None):
+        self.method = 'scrypt:32768:8:1'
+        self.workers = 1
+        self.max_pending = 1
+        self._executor = None
+        self._slots = None
+        self._prefix = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS') or max(1, (os.cpu_count() or 2) // 2)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', 32)
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+            # Trabajos admitidos a la vez (en ejecución + en cola)
+            self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+            self._prefix = None
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        if not pwhash:
+            return False
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """
+        Indica si el hash fue calculado con otros parámetros que los configurados
+        (p. ej. se aumentó el costo de scrypt o se cambió de algoritmo).
+        """
+        if self._prefix is None:
+            # Prefijo canónico del método ('pbkdf2' -> 'pbkdf2:sha256:1000000')
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return not pwhash or pwhash.split('$', 1)[0] != self._prefix
@@ -0,0 +1,78 @@
+"""
+Proveedores JSON de la aplicación (app.json).
+Las fechas y horas se serializan en ISO 8601 de forma nativa, de modo que los to_dict pueden
+devolver los objetos date/datetime/time tal como vienen de la base. Con orjson instalado
+(JSON_PROVIDER='orjson', el valor por defecto) la codificación es varias veces más rápida que
+con el módulo json de la biblioteca estándar; sin orjson se usa el proveedor estándar.
+"""
+
+import logging
+from datetime import date, time
+
+from flask.json.provider import DefaultJSONProvider, _default
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def _iso_default(o):
+    # Flask serializa las fechas como fecha HTTP (RFC 822); la API usa ISO 8601
+    if isinstance(o, (date, time)):
+        return o.isoformat()
+    return _default(o)
+
+
+class ISOJSONProvider(DefaultJSONProvider):
+    """Proveedor estándar de Flask con fechas y horas en ISO 8601."""
+
+    default = staticmethod(_iso_default)
+
+
+class OrjsonProvider(ISOJSONProvider):
+    """
+    Proveedor basado en orjson (fechas, horas y datetimes nativos, salida UTF-8).
+    Respeta sort_keys y, en modo debug, la salida indentada del proveedor estándar.
+    """
+
+    def _options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        data = orjson.dumps(obj, default=self.default, option=self._options(indent))
+        return self._app.response_class(data + b'\n', mimetype=self.mimetype)
+
+
+PROVIDERS = {
+    'default': ISOJSONProvider,
+    'orjson': OrjsonProvider,
+}
+
+
+def json_provider(app):
+    """Crea el proveedor configurado en JSON_PROVIDER (si orjson no está instalado, usa el estándar)."""
+    name = app.config.get('JSON_PROVIDER', 'orjson')
+    if name not in PROVIDERS:
+        raise ValueError(f"JSON_PROVIDER no soportado: {name}")
+    if name == 'orjson' and orjson is None:
+        logger.warning("orjson no está instalado; se usa el proveedor JSON estándar")
+        name = 'default'
+    # Claves ordenadas como el proveedor estándar de Flask (JSON_SORT_KEYS ya no se lee en Flask 3),
+    # para que el orden de las respuestas no cambie al elegir proveedor
+    return PROVIDERS[name](app)
@@ -0,0 +1,33 @@
+"""
+Sesión de base de datos con enrutamiento a una réplica de solo lectura.
+Las vistas marcadas con @read_only envían sus consultas a la conexión 'replica'
+(SQLALCHEMY_BINDS) si está configurada; las escrituras siempre van a la base principal.
+"""
+
+from functools import wraps
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+
+
+class RoutingSession(Session):
+    """Sesión que usa la réplica durante las peticiones de solo lectura."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('read_only'):
+            engines = self._db.engines
+            if 'replica' in engines:
+                return engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    """
+    Marca una vista como de solo lectura (listados y reportes) para que lea de la réplica.
+    La réplica puede tener algo de retraso respecto de la base principal.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_only = True
+        return view(*args, **kwargs)
+    return wrapper
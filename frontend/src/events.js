@@ -0,0 +1,19 @@
+import api from './axios'
+
+// Suscripción a /api/events (Server-Sent Events). EventSource no permite encabezados,
+// así que el token viaja como ?jwt=. Devuelve una función para cerrar la conexión.
+export function suscribirEventos(params, handlers) {
+  const query = new URLSearchParams({ ...params, jwt: localStorage.getItem('token') || '' })
+  const source = new EventSource(`${api.defaults.baseURL}/events?${query}`)
+  for (const [tipo, handler] of Object.entries(handlers)) {
+    source.addEventListener(tipo, e => handler(JSON.parse(e.data)))
+  }
+  return () => source.close()
+}
+
+// Aplica a la lista los cambios de una cita recibidos por evento. Al reconectarse pueden
+// repetirse eventos recientes: se ignoran los de una versión anterior a la que ya se tiene
+export function aplicarCambioCita(lista, cambio) {
+  const cita = lista.find(c => c.id === cambio.id)
+  if (cita && !(cambio.version < cita.version)) Object.assign(cita, cambio)
+}
@@ -0,0 +1,79 @@
+"""Archivo de citas
+
+Revision ID: 0496520bdbcd
+Revises: efa86bbf5e8f
+Create Date: 2026-10-18 18:33:41.382064
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0496520bdbcd'
+down_revision = 'efa86bbf5e8f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('appointment_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('pet_id', sa.Integer(), nullable=False),
+    sa.Column('vet_id', sa.Integer(), nullable=True),
+    sa.Column('service_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=True),
+    sa.Column('time', sa.Time(), nullable=False),
+    sa.Column('paid', sa.Boolean(), nullable=True),
+    sa.Column('payment_method', sa.String(length=50), nullable=True),
+    sa.Column('payment_amount', sa.Float(), nullable=True),
+    sa.Column('payment_date', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('drop_off', sa.Boolean(), nullable=True),
+    sa.Column('pickup_code', sa.String(length=20), nullable=True),
+    sa.Column('collected', sa.Boolean(), nullable=True),
+    sa.Column('starts_at', sa.DateTime(), nullable=True),
+    sa.Column('ends_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['client.id'], ),
+    sa.ForeignKeyConstraint(['pet_id'], ['pet.id'], ),
+    sa.ForeignKeyConstraint(['service_id'], ['service.id'], ),
+    sa.ForeignKeyConstraint(['vet_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('appointment_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_archive_pet_id_date', ['pet_id', 'date'], unique=False)
+        batch_op.create_index('ix_appointment_archive_service_id', ['service_id'], unique=False)
+
+    op.create_table('clinical_history_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('pet_id', sa.Integer(), nullable=False),
+    sa.Column('observation', sa.Text(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=True),
+    sa.Column('date', sa.DateTime(), nullable=True),
+    sa.Column('vet_id', sa.Integer(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointment_archive.id'], ),
+    sa.ForeignKeyConstraint(['pet_id'], ['pet.id'], ),
+    sa.ForeignKeyConstraint(['vet_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('clinical_history_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_clinical_history_archive_appointment_id', ['appointment_id'], unique=False)
+        batch_op.create_index('ix_clinical_history_archive_pet_id_date', ['pet_id', 'date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('clinical_history_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_clinical_history_archive_pet_id_date')
+        batch_op.drop_index('ix_clinical_history_archive_appointment_id')
+
+    op.drop_table('clinical_history_archive')
+    with op.batch_alter_table('appointment_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_archive_service_id')
+        batch_op.drop_index('ix_appointment_archive_pet_id_date')
+
+    op.drop_table('appointment_archive')
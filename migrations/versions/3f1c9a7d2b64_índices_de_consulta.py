@@ -0,0 +1,57 @@
+"""Índices de consulta
+
+Revision ID: 3f1c9a7d2b64
+Revises: 8148a68de9cb
+Create Date: 2026-10-18 10:12:41.503217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2b64'
+down_revision = '8148a68de9cb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Índices para los filtros y ordenamientos usados en app/routes.py
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index('ix_user_role', ['role'], unique=False)
+
+    with op.batch_alter_table('pet', schema=None) as batch_op:
+        batch_op.create_index('ix_pet_client_id', ['client_id'], unique=False)
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_vet_id_date', ['vet_id', 'date'], unique=False)
+        batch_op.create_index('ix_appointment_paid_payment_date', ['paid', 'payment_date'], unique=False)
+        batch_op.create_index('ix_appointment_date', ['date'], unique=False)
+        batch_op.create_index('ix_appointment_service_id', ['service_id'], unique=False)
+
+    with op.batch_alter_table('clinical_history', schema=None) as batch_op:
+        batch_op.create_index('ix_clinical_history_pet_id_date', ['pet_id', 'date'], unique=False)
+        batch_op.create_index('ix_clinical_history_appointment_id', ['appointment_id'], unique=False)
+        batch_op.create_index('ix_clinical_history_vet_id_date', ['vet_id', 'date'], unique=False)
+        batch_op.create_index('ix_clinical_history_date', ['date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('clinical_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_clinical_history_date')
+        batch_op.drop_index('ix_clinical_history_vet_id_date')
+        batch_op.drop_index('ix_clinical_history_appointment_id')
+        batch_op.drop_index('ix_clinical_history_pet_id_date')
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_service_id')
+        batch_op.drop_index('ix_appointment_date')
+        batch_op.drop_index('ix_appointment_paid_payment_date')
+        batch_op.drop_index('ix_appointment_vet_id_date')
+
+    with op.batch_alter_table('pet', schema=None) as batch_op:
+        batch_op.drop_index('ix_pet_client_id')
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_role')
@@ -0,0 +1,42 @@
+"""Índices de búsqueda rápida
+
+Revision ID: 5d2f8a1c6e47
+Revises: e91d3b5a7c02
+Create Date: 2026-10-18 16:05:12.318840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2f8a1c6e47'
+down_revision = 'e91d3b5a7c02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Búsqueda por prefijo de /api/lookup/clients y /api/lookup/pets
+    with op.batch_alter_table('client', schema=None) as batch_op:
+        batch_op.create_index('ix_client_name', ['name'], unique=False)
+        batch_op.create_index('ix_client_dni', ['dni'], unique=False)
+        batch_op.create_index('ix_client_phone', ['phone'], unique=False)
+
+    # (client_id, name) también cubre los filtros por client_id que usaba ix_pet_client_id
+    with op.batch_alter_table('pet', schema=None) as batch_op:
+        batch_op.create_index('ix_pet_client_id_name', ['client_id', 'name'], unique=False)
+        batch_op.create_index('ix_pet_name', ['name'], unique=False)
+        batch_op.drop_index('ix_pet_client_id')
+
+
+def downgrade():
+    with op.batch_alter_table('pet', schema=None) as batch_op:
+        batch_op.create_index('ix_pet_client_id', ['client_id'], unique=False)
+        batch_op.drop_index('ix_pet_name')
+        batch_op.drop_index('ix_pet_client_id_name')
+
+    with op.batch_alter_table('client', schema=None) as batch_op:
+        batch_op.drop_index('ix_client_phone')
+        batch_op.drop_index('ix_client_dni')
+        batch_op.drop_index('ix_client_name')
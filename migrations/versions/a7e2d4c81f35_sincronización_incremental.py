@@ -0,0 +1,49 @@
+"""Sincronización incremental
+
+Revision ID: a7e2d4c81f35
+Revises: 3f1c9a7d2b64
+Create Date: 2026-10-18 11:40:08.217903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7e2d4c81f35'
+down_revision = '3f1c9a7d2b64'
+branch_labels = None
+depends_on = None
+
+SYNC_TABLES = ('client', 'pet', 'appointment', 'service', 'clinical_history')
+
+
+def upgrade():
+    op.create_table('tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=40), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('tombstone', schema=None) as batch_op:
+        batch_op.create_index('ix_tombstone_deleted_at', ['deleted_at'], unique=False)
+
+    for table in SYNC_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+            batch_op.create_index(f'ix_{table}_updated_at', ['updated_at'], unique=False)
+        # Las filas existentes toman la fecha de la migración
+        op.execute(sa.text(f'UPDATE {table} SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL'))
+
+
+def downgrade():
+    for table in reversed(SYNC_TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_updated_at')
+            batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('tombstone', schema=None) as batch_op:
+        batch_op.drop_index('ix_tombstone_deleted_at')
+
+    op.drop_table('tombstone')
@@ -0,0 +1,46 @@
+"""Acumulado diario de ingresos
+
+Revision ID: b83e0c5f9d21
+Revises: 5d2f8a1c6e47
+Create Date: 2026-10-18 16:48:27.904113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b83e0c5f9d21'
+down_revision = '5d2f8a1c6e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_revenue',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=True),
+    sa.Column('service_id', sa.Integer(), nullable=True),
+    sa.Column('payment_method', sa.String(length=50), nullable=True),
+    sa.Column('vet_id', sa.Integer(), nullable=True),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('payment_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('daily_revenue', schema=None) as batch_op:
+        batch_op.create_index('ix_daily_revenue_bucket', ['date', 'service_id', 'vet_id', 'payment_method'], unique=False)
+
+    # Carga inicial desde las citas ya pagadas (DATE() existe en MySQL y SQLite)
+    op.execute(
+        "INSERT INTO daily_revenue (date, service_id, payment_method, vet_id, total, payment_count) "
+        "SELECT DATE(payment_date), service_id, payment_method, vet_id, COALESCE(SUM(payment_amount), 0), COUNT(id) "
+        "FROM appointment WHERE paid = 1 "
+        "GROUP BY DATE(payment_date), service_id, payment_method, vet_id"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('daily_revenue', schema=None) as batch_op:
+        batch_op.drop_index('ix_daily_revenue_bucket')
+
+    op.drop_table('daily_revenue')
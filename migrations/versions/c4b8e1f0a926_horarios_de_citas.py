@@ -0,0 +1,55 @@
+"""Horarios de citas
+
+Revision ID: c4b8e1f0a926
+Revises: a7e2d4c81f35
+Create Date: 2026-10-18 13:05:52.640118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4b8e1f0a926'
+down_revision = 'a7e2d4c81f35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('service', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('duration_minutes', sa.Integer(), server_default='30', nullable=False))
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('starts_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('ends_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_appointment_vet_id_starts_at', ['vet_id', 'starts_at'], unique=False)
+
+    # Completa inicio y fin de las citas existentes (fecha + hora, duración por defecto del servicio)
+    # con un único UPDATE calculado en SQL
+    appointment = sa.table('appointment',
+        sa.column('date', sa.DateTime), sa.column('time', sa.Time),
+        sa.column('starts_at', sa.DateTime), sa.column('ends_at', sa.DateTime))
+    day = sa.func.date(appointment.c.date)
+    if op.get_bind().dialect.name == 'sqlite':
+        # Mismo formato de texto que guarda SQLAlchemy en SQLite ('YYYY-MM-DD HH:MM:SS.ffffff')
+        start = day.op('||')(' ').op('||')(appointment.c.time)
+        starts_at = sa.func.datetime(start).op('||')('.000000')
+        ends_at = sa.func.datetime(start, '+30 minutes').op('||')('.000000')
+    else:
+        starts_at = sa.func.timestamp(day, appointment.c.time)
+        ends_at = sa.func.timestampadd(sa.text('MINUTE'), 30, starts_at)
+    op.execute(
+        appointment.update().where(appointment.c.date.isnot(None))
+        .values(starts_at=starts_at, ends_at=ends_at)
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_vet_id_starts_at')
+        batch_op.drop_column('ends_at')
+        batch_op.drop_column('starts_at')
+
+    with op.batch_alter_table('service', schema=None) as batch_op:
+        batch_op.drop_column('duration_minutes')
@@ -0,0 +1,34 @@
+"""Búsqueda en historial clínico
+
+Revision ID: e91d3b5a7c02
+Revises: c4b8e1f0a926
+Create Date: 2026-10-18 14:22:37.918455
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91d3b5a7c02'
+down_revision = 'c4b8e1f0a926'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # MySQL: índice FULLTEXT; SQLite: tabla FTS5 con las observaciones existentes (ver app/search.py)
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.execute('CREATE FULLTEXT INDEX ix_clinical_history_observation_ft ON clinical_history (observation)')
+    elif dialect == 'sqlite':
+        op.execute('CREATE VIRTUAL TABLE IF NOT EXISTS clinical_history_fts USING fts5(observation)')
+        op.execute('INSERT INTO clinical_history_fts (rowid, observation) SELECT id, observation FROM clinical_history')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.drop_index('ix_clinical_history_observation_ft', table_name='clinical_history')
+    elif dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS clinical_history_fts')
@@ -0,0 +1,37 @@
+"""Eventos de cambios
+
+Revision ID: efa86bbf5e8f
+Revises: de6ebc0b7677
+Create Date: 2026-10-18 18:30:27.492460
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'efa86bbf5e8f'
+down_revision = 'de6ebc0b7677'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(length=40), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('vet_id', sa.Integer(), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('change_event', schema=None) as batch_op:
+        batch_op.create_index('ix_change_event_created_at', ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('change_event', schema=None) as batch_op:
+        batch_op.drop_index('ix_change_event_created_at')
+
+    op.drop_table('change_event')
@@ -0,0 +1,52 @@
+"""
+Fixtures de las pruebas: aplicación con la configuración 'testing' (SQLite en memoria),
+datos mínimos y un cliente HTTP autenticado como administrador.
+"""
+
+from datetime import datetime, time
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models import User, Client, Pet, Service, Appointment
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def data(app):
+    # Un veterinario, un servicio, un cliente con su mascota y una cita sin pagar
+    admin = User(username='admin', email='admin@test', role='admin')
+    admin.set_password('secreto')
+    vet = User(username='vet', email='vet@test', role='veterinario')
+    vet.set_password('secreto')
+    service = Service(name='Consulta', price=100, attention_type='presencial')
+    client = Client(name='Ana', email='ana@test', dni='1000')
+    db.session.add_all([admin, vet, service, client])
+    db.session.flush()
+    pet = Pet(name='Luna', species='perro', breed='mestizo', age=3, client_id=client.id)
+    db.session.add(pet)
+    db.session.flush()
+    appointment = Appointment(client_id=client.id, pet_id=pet.id, vet_id=vet.id, service_id=service.id,
+                              date=datetime(2019, 1, 1, 10), time=time(10, 0))
+    db.session.add(appointment)
+    db.session.commit()
+    return {"admin": admin.id, "vet": vet.id, "service": service.id, "client": client.id, "pet": pet.id,
+            "appointment": appointment.id}
+
+
+@pytest.fixture
+def api(app, data):
+    client = app.test_client()
+    token = create_access_token(identity=str(data["admin"]), additional_claims={'role': 'admin'})
+    client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return client
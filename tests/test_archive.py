@@ -0,0 +1,50 @@
+import csv
+import io
+from datetime import datetime, time
+
+from app import db
+from app.archive import archive_closed
+from app.models import Appointment, ArchivedAppointment
+
+
+def pay_and_archive(api, data):
+    api.post('/api/payments', json={'appointment_id': data['appointment'], 'payment_method': 'efectivo',
+                                    'payment_amount': 100})
+    appointment = db.session.get(Appointment, data['appointment'])
+    appointment.status = 'atendida'
+    appointment.payment_date = datetime(2019, 1, 1, 11)
+    db.session.commit()
+    from app.controllers import rebuild_daily_revenue
+    rebuild_daily_revenue()
+    assert archive_closed(datetime(2020, 1, 1)) == (1, 0)
+    assert db.session.get(ArchivedAppointment, data['appointment']) is not None
+
+
+def test_archived_payments_count_with_either_date_format(api, data):
+    pay_and_archive(api, data)
+    totals = []
+    for query in ('start_date=2019-01-01&end_date=2019-01-01',
+                  'start_date=2019-01-01T00:00&end_date=2019-01-01T23:59',
+                  'start_date=2019-01-01'):
+        report = api.get(f'/api/reports/payments?include_rows=true&group_by=day,vet&{query}').get_json()
+        totals.append((report['total_pagado'], report['cantidad_pagos'], len(report['pagos']), report['resumen']))
+    assert totals[0][:3] == (100, 1, 1)
+    assert totals[0] == totals[1] == totals[2]
+
+
+def test_payments_list_includes_archived(api, data):
+    pay_and_archive(api, data)
+    assert [p['id'] for p in api.get('/api/payments').get_json()] == [data['appointment']]
+
+
+def test_payments_export_merges_archived_in_payment_order(app, api, data):
+    pay_and_archive(api, data)
+    for day in (datetime(2018, 12, 31), datetime(2019, 1, 2)):
+        db.session.add(Appointment(client_id=data['client'], pet_id=data['pet'], vet_id=data['vet'],
+                                   service_id=data['service'], date=day, time=time(10), paid=True, payment_method='efectivo',
+                                   payment_amount=100, payment_date=day))
+    db.session.commit()
+    app.config['EXPORT_BATCH_SIZE'] = 1
+    rows = list(csv.DictReader(io.StringIO(api.get('/api/reports/payments?format=csv').get_data(as_text=True))))
+    assert [row['payment_date'] for row in rows] == \
+        ['2018-12-31T00:00:00', '2019-01-01T11:00:00', '2019-01-02T00:00:00']
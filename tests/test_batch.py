@@ -0,0 +1,30 @@
+import json
+
+from app import db
+from app.models import Appointment, ChangeEvent
+
+
+def last_event(type):
+    event = ChangeEvent.query.filter_by(type=type).order_by(ChangeEvent.id.desc()).first()
+    return json.loads(event.payload)
+
+
+def test_batch_event_carries_stored_version(api, data):
+    response = api.patch('/api/appointments/batch', json={'changes': [{'id': data['appointment'], 'collected': True}]})
+    assert response.get_json()['data']['results'][0]['status'] == 200
+    db.session.expire_all()
+    stored = db.session.get(Appointment, data['appointment']).version
+    assert last_event('appointment')['version'] == stored == 2
+
+
+def test_batch_reports_each_change(api, data):
+    response = api.patch('/api/appointments/batch', json={'changes': [
+        {'id': data['appointment'], 'version': 5, 'collected': True},
+        {'id': 999999, 'collected': True},
+        {'collected': True},
+    ]})
+    results = response.get_json()['data']['results']
+    assert [result['status'] for result in results] == [409, 404, 400]
+    assert results[0]['version'] == 1
+    db.session.expire_all()
+    assert db.session.get(Appointment, data['appointment']).version == 1
@@ -0,0 +1,47 @@
+import json
+
+from app import db
+from app.models import Appointment, ChangeEvent
+
+
+def last_event(type):
+    event = ChangeEvent.query.filter_by(type=type).order_by(ChangeEvent.id.desc()).first()
+    return json.loads(event.payload)
+
+
+def test_update_event_carries_stored_version(api, data):
+    response = api.put(f"/api/appointments/{data['appointment']}", json={'status': 'atendida', 'version': 1})
+    assert response.status_code == 200
+    stored = db.session.get(Appointment, data['appointment']).version
+    assert stored == 2
+    assert response.get_json()['data']['version'] == stored
+    assert last_event('appointment')['version'] == stored
+
+
+def test_payment_event_carries_stored_version(api, data):
+    response = api.post('/api/payments', json={'appointment_id': data['appointment'], 'payment_method': 'efectivo',
+                                               'payment_amount': 100})
+    assert response.status_code == 200
+    stored = db.session.get(Appointment, data['appointment']).version
+    assert last_event('payment')['version'] == stored == 2
+
+
+def test_stale_version_is_rejected(api, data):
+    api.put(f"/api/appointments/{data['appointment']}", json={'status': 'atendida'})
+    response = api.put(f"/api/appointments/{data['appointment']}", json={'status': 'cancelada', 'version': 1})
+    assert response.status_code == 409
+    db.session.expire_all()
+    assert db.session.get(Appointment, data['appointment']).status == 'atendida'
+
+
+def test_idempotency_key_replays_payment(api, data):
+    body = {'appointment_id': data['appointment'], 'payment_method': 'efectivo', 'payment_amount': 100}
+    headers = {'Idempotency-Key': 'pago-1'}
+    first = api.post('/api/payments', json=body, headers=headers)
+    second = api.post('/api/payments', json=body, headers=headers)
+    assert first.status_code == second.status_code == 200
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert second.get_data() == first.get_data()
+    assert db.session.get(Appointment, data['appointment']).version == 2
+    other = api.post('/api/payments', json=dict(body, payment_amount=50), headers=headers)
+    assert other.status_code == 422
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from app import db
+from app.models import ClinicalHistory
+from app.search import reindex_observations
+
+
+def test_date_only_end_includes_whole_day(api, data):
+    response = api.get('/api/reports/appointments?start_date=2019-01-01&end_date=2019-01-01')
+    assert [a['id'] for a in response.get_json()] == [data['appointment']]
+    response = api.get('/api/reports/appointments?end_date=2019-01-01T09:59')
+    assert response.get_json() == []
+
+
+def test_search_end_date_includes_whole_day(api, data):
+    db.session.add(ClinicalHistory(pet_id=data['pet'], observation='control de parvovirus',
+                                   vet_id=data['vet'], date=datetime(2019, 1, 1, 15, 30)))
+    db.session.commit()
+    reindex_observations()
+    response = api.get('/api/clinical-history/search?q=parvovirus&end_date=2019-01-01')
+    assert len(response.get_json()['data']) == 1
+    response = api.get('/api/clinical-history/search?q=parvovirus&end_date=2019-01-01T12:00')
+    assert response.get_json()['data'] == []
+
+
+def test_invalid_date_is_rejected(api, data):
+    assert api.get('/api/reports/payments?end_date=ayer').status_code == 400
@@ -0,0 +1,28 @@
+from itertools import islice
+
+from app import db, events
+from app.models import ChangeEvent
+
+
+def add_event(event_id, entity_id):
+    db.session.add(ChangeEvent(id=event_id, type='appointment', entity_id=entity_id, payload='{}'))
+    db.session.commit()
+
+
+def sent_ids(stream, count):
+    # Ids de los próximos 'count' eventos del stream (ignora retry y keep-alive)
+    messages = (message for message in stream if message.startswith('id: '))
+    return [int(message.split('\n')[0][4:]) for message in islice(messages, count)]
+
+
+def test_event_committed_late_with_lower_id_is_delivered(app, data, monkeypatch):
+    monkeypatch.setattr(events, 'poll_seconds', 0)
+    monkeypatch.setattr(events, 'max_stream_seconds', 1)
+    stream = events.stream(after_id=0)
+    # El evento 11 se confirma antes que el 10 (transacción más larga)
+    add_event(11, data['appointment'])
+    assert sent_ids(stream, 1) == [11]
+    add_event(10, data['appointment'])
+    add_event(12, data['appointment'])
+    assert sent_ids(stream, 2) == [10, 12]
+    stream.close()
@@ -0,0 +1,18 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import create_app, db
+from app.config import TestingConfig
+
+
+def test_failed_statement_does_not_leak_timing(monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'PROFILING_ENABLED', True, raising=False)
+    app = create_app('testing')
+    with app.app_context():
+        with pytest.raises(OperationalError):
+            db.session.execute(text('SELECT * FROM tabla_inexistente'))
+        db.session.rollback()
+        connection = db.session.connection()
+        db.session.execute(text('SELECT 1'))
+        assert connection.info.get('query_started') == []
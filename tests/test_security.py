@@ -0,0 +1,37 @@
+import time
+
+import pytest
+
+from app import hasher
+from app.security import HasherBusy
+
+
+def busy(*args):
+    raise HasherBusy()
+
+
+def test_saturated_hasher_returns_503(api, data, monkeypatch):
+    monkeypatch.setattr(hasher, '_run', busy)
+    requests = [
+        api.post('/api/login', json={'username': 'admin', 'password': 'secreto'}),
+        api.post('/api/users', json={'username': 'nuevo', 'email': 'n@test', 'role': 'recepcionista',
+                                     'password': 'secreto'}),
+        api.put(f"/api/users/{data['vet']}/password", json={'new_password': 'otra'}),
+    ]
+    for response in requests:
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+
+
+def test_full_pool_rejects_without_waiting():
+    slots = hasher.workers + hasher.max_pending
+    for _ in range(slots):
+        hasher._slots.acquire()
+    try:
+        started = time.monotonic()
+        with pytest.raises(HasherBusy):
+            hasher.verify('pbkdf2:sha256:1$x$y', 'secreto')
+        assert time.monotonic() - started < 1
+    finally:
+        for _ in range(slots):
+            hasher._slots.release()